@@ -1,15 +1,15 @@
 import database
+import pipeline
+import stream
+import layanan
+import metrik
+from cache import ByteBudgetCache, LRUCache
 import streamlit as st
-from ultralytics import YOLO
-from PIL import Image
 import cv2
-import numpy as np
-import matplotlib.pyplot as plt
-from fpdf import FPDF
-import tempfile
+import grafik
+import laporan
 import os
-import io
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 
 # 1. KONFIGURASI & SETUP
 st.set_page_config(
@@ -19,7 +19,6 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-database.init_db()
 st.markdown("""
     <style>
     .main {background-color: #f4f6f9;}
@@ -30,8 +29,7 @@ st.markdown("""
 
 # Sidebar Info
 with st.sidebar:
-    st.image("https://cdn-icons-png.flaticon.com/512/2921/2921226.png", width=80)
-    st.title("Panel Kontrol")
+    st.title("🍱 Panel Kontrol")
     st.info("""
     **Tentang Proyek:**
     Implementasi Deep Learning YOLOv8 untuk Deteksi Komposisi Menu Program Makan Bergizi Gratis.
@@ -40,358 +38,313 @@ with st.sidebar:
     conf_threshold = st.slider("Akurasi (Confidence)", 0.05, 1.0, 0.15, help="Geser ke kiri jika objek tidak muncul.")
     nms_threshold = st.slider("IoU (Tumpukan)", 0.1, 1.0, 0.45)
     st.divider()
+    tampil_performa = st.toggle("📊 Panel Performa", value=False, help="Latensi per tahap pipeline & jumlah scan")
     st.info("ℹ️ **Nutri-Scan Final**\nDatabase: 51 Kelas MBG\nFitur: PDF, HD Upscale, Smart Filter.")
 
 @st.cache_resource
 def load_model():
-    return YOLO("best.pt")
-
-try:
-    model = load_model()
-except:
-    st.error("⚠️ File 'best.pt' tidak ditemukan! Pastikan file ada di folder proyek.")
-    st.stop()
-
-# --- DATABASE GIZI LENGKAP (51 KELAS DATASET) ---
-# Format Macros: (Karbohidrat, Protein, Lemak) dalam gram
-database_gizi = {
-    # === KARBOHIDRAT (NASI & MIE) ===
-    "nasi putih":     {"label": "Nasi Putih",         "kalori": 175, "tipe": "Karbohidrat", "macros": (40, 4, 0)},
-    "nasi kuning":    {"label": "Nasi Kuning",        "kalori": 200, "tipe": "Karbohidrat", "macros": (42, 4, 4)},
-    "nasi goreng":    {"label": "Nasi Goreng",        "kalori": 250, "tipe": "Karbohidrat", "macros": (45, 6, 8)},
-    "mie":            {"label": "Mie Goreng/Rebus",   "kalori": 220, "tipe": "Karbohidrat", "macros": (35, 5, 8)},
-    "kentang goreng": {"label": "Kentang Goreng",     "kalori": 150, "tipe": "Karbohidrat", "macros": (20, 2, 7)},
-    "burger":         {"label": "Burger",             "kalori": 300, "tipe": "Karbohidrat/Protein", "macros": (30, 15, 12)},
-
-    # === PROTEIN HEWANI (AYAM) ===
-    "ayam goreng":    {"label": "Ayam Goreng",        "kalori": 200, "tipe": "Protein Hewani", "macros": (2, 22, 12)},
-    "ayam bakar":     {"label": "Ayam Bakar",         "kalori": 180, "tipe": "Protein Hewani", "macros": (4, 24, 8)},
-    "ayam kecap":     {"label": "Ayam Kecap",         "kalori": 210, "tipe": "Protein Hewani", "macros": (8, 22, 10)},
-    "ayam krispi":    {"label": "Ayam Krispi/Fried Chicken", "kalori": 280, "tipe": "Protein Hewani", "macros": (15, 20, 18)},
-    "ayam suwir":     {"label": "Ayam Suwir",         "kalori": 150, "tipe": "Protein Hewani", "macros": (2, 25, 5)},
-    "katsu":          {"label": "Chicken Katsu",      "kalori": 250, "tipe": "Protein Hewani", "macros": (15, 18, 14)},
-    "nugget":         {"label": "Nugget Ayam",        "kalori": 180, "tipe": "Protein Hewani", "macros": (12, 10, 10)},
-
-    # === PROTEIN HEWANI (DAGING, IKAN, BAKSO) ===
-    "olahan daging sapi": {"label": "Olahan Daging Sapi", "kalori": 220, "tipe": "Protein Hewani", "macros": (5, 22, 12)},
-    "bakso":          {"label": "Bakso",              "kalori": 190, "tipe": "Protein Hewani", "macros": (10, 12, 10)},
-    "lele goreng":    {"label": "Lele Goreng",        "kalori": 160, "tipe": "Protein Hewani", "macros": (3, 15, 10)},
-
-    # === PROTEIN HEWANI (TELUR) ===
-    "telur rebus":    {"label": "Telur Rebus",        "kalori": 75,  "tipe": "Protein Hewani", "macros": (0, 7, 5)},
-    "telur goreng":   {"label": "Telur Goreng/Dadar", "kalori": 110, "tipe": "Protein Hewani", "macros": (1, 7, 9)},
-    "telur kecap":    {"label": "Telur Kecap",        "kalori": 130, "tipe": "Protein Hewani", "macros": (5, 7, 9)},
-
-    # === PROTEIN NABATI (TAHU & TEMPE) ===
-    "tahu":           {"label": "Tahu",               "kalori": 70,  "tipe": "Protein Nabati", "macros": (2, 8, 4)},
-    "tahu goreng":    {"label": "Tahu Goreng",        "kalori": 85,  "tipe": "Protein Nabati", "macros": (3, 8, 6)},
-    "tahu bacem":     {"label": "Tahu Bacem",         "kalori": 100, "tipe": "Protein Nabati", "macros": (8, 8, 5)},
-    "tempe goreng":   {"label": "Tempe Goreng",       "kalori": 100, "tipe": "Protein Nabati", "macros": (7, 9, 6)},
-    "tempe bacem":    {"label": "Tempe Bacem",        "kalori": 120, "tipe": "Protein Nabati", "macros": (12, 9, 6)},
-    "tempe orek":     {"label": "Tempe Orek",         "kalori": 130, "tipe": "Protein Nabati", "macros": (15, 8, 6)},
-    "keripik tempe":  {"label": "Keripik Tempe",      "kalori": 150, "tipe": "Pelengkap", "macros": (18, 5, 8)},
-
-    # === SAYURAN (SERAT & VITAMIN) ===
-    "sayur sop":      {"label": "Sayur Sop",          "kalori": 60,  "tipe": "Serat & Vitamin", "macros": (8, 2, 2)},
-    "sayur bayam":    {"label": "Sayur Bayam",        "kalori": 40,  "tipe": "Serat & Vitamin", "macros": (4, 2, 0)},
-    "sayur tumis":    {"label": "Tumis Sayur",        "kalori": 70,  "tipe": "Serat & Vitamin", "macros": (6, 2, 4)},
-    "sayur pakcoy":   {"label": "Tumis Pakcoy",       "kalori": 50,  "tipe": "Serat & Vitamin", "macros": (5, 2, 3)},
-    "cah kangkung":   {"label": "Cah Kangkung",       "kalori": 60,  "tipe": "Serat & Vitamin", "macros": (5, 3, 4)},
-    "cah sayur":      {"label": "Cah Sayuran",        "kalori": 60,  "tipe": "Serat & Vitamin", "macros": (5, 2, 4)},
-    "selada air":     {"label": "Selada Air",         "kalori": 20,  "tipe": "Serat & Vitamin", "macros": (2, 1, 0)},
-    "kemangi":        {"label": "Daun Kemangi",       "kalori": 5,   "tipe": "Serat & Vitamin", "macros": (1, 0, 0)},
-    "timun":          {"label": "Potongan Timun",     "kalori": 10,  "tipe": "Serat & Vitamin", "macros": (2, 0, 0)},
-    "tomat":          {"label": "Potongan Tomat",     "kalori": 15,  "tipe": "Serat & Vitamin", "macros": (3, 1, 0)},
-
-    # === BUAH-BUAHAN (VITAMIN) ===
-    "buah pisang":    {"label": "Pisang",             "kalori": 90,  "tipe": "Vitamin", "macros": (23, 1, 0)},
-    "buah jeruk":     {"label": "Jeruk",              "kalori": 45,  "tipe": "Vitamin", "macros": (11, 1, 0)},
-    "buah apel":      {"label": "Apel",               "kalori": 52,  "tipe": "Vitamin", "macros": (14, 0, 0)},
-    "buah semangka":  {"label": "Semangka",           "kalori": 30,  "tipe": "Vitamin", "macros": (8, 1, 0)},
-    "buah melon":     {"label": "Melon",              "kalori": 34,  "tipe": "Vitamin", "macros": (9, 1, 0)},
-    "buah pepaya":    {"label": "Pepaya",             "kalori": 43,  "tipe": "Vitamin", "macros": (11, 0, 0)},
-    "buah salak":     {"label": "Salak",              "kalori": 70,  "tipe": "Vitamin", "macros": (17, 1, 0)},
-    "buah anggur":    {"label": "Anggur",             "kalori": 67,  "tipe": "Vitamin", "macros": (17, 0, 0)},
-    "buah kelengkeng":{"label": "Kelengkeng",         "kalori": 60,  "tipe": "Vitamin", "macros": (15, 1, 0)},
-    "buah naga":      {"label": "Buah Naga",          "kalori": 50,  "tipe": "Vitamin", "macros": (13, 1, 0)},
-    "buah strawberry":{"label": "Strawberry",         "kalori": 32,  "tipe": "Vitamin", "macros": (8, 1, 0)},
-
-    # === PELENGKAP & MINUMAN ===
-    "acar biasa":     {"label": "Acar Timun/Wortel",  "kalori": 30,  "tipe": "Pelengkap", "macros": (5, 0, 0)},
-    "acar mayo":      {"label": "Salad/Acar Mayo",    "kalori": 80,  "tipe": "Pelengkap", "macros": (4, 1, 7)},
-    "susu":           {"label": "Susu UHT/Kotak",     "kalori": 120, "tipe": "Minuman Bergizi", "macros": (10, 6, 6)},
-    
-    # === LAINNYA (NON-MAKANAN) ===
-    "tray mbg":       {"label": "Nampan MBG",         "kalori": 0,   "tipe": "Wadah", "macros": (0, 0, 0)},
-}
-
-# 3. KELAS PDF GENERATOR
-class PDF(FPDF):
-    def header(self):
-        self.set_font('Arial', 'B', 16)
-        self.cell(0, 10, 'LAPORAN DETEKSI KOMPOSISI MENU MBG', 0, 1, 'C')
-        self.set_font('Arial', 'I', 10)
-        self.cell(0, 5, 'Implementasi Deep Learning YOLOv8 pada Program Makan Bergizi Gratis', 0, 1, 'C')
-        self.ln(10)
-    def footer(self):
-        self.set_y(-15)
-        self.set_font('Arial', 'I', 8)
-        self.cell(0, 10, f'Halaman {self.page_no()} - Sistem Deteksi Komposisi Menu', 0, 0, 'C')
-
-# 4. FUNGSI PENGOLAHAN CITRA (PCD) & FILTER
-def process_image(pil_image, upscale=False):
-    img_array = np.array(pil_image)
-    img_cv = cv2.cvtColor(img_array, cv2.COLOR_RGB2BGR)
-    
-    # 1. CLAHE (Contrast Limited Adaptive Histogram Equalization)
-    img_yuv = cv2.cvtColor(img_cv, cv2.COLOR_BGR2YUV)
-    clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
-    img_yuv[:,:,0] = clahe.apply(img_yuv[:,:,0])
-    img_enhanced = cv2.cvtColor(img_yuv, cv2.COLOR_YUV2RGB)
-    
-    # 2. Bilateral Filter
-    img_smooth = cv2.bilateralFilter(img_enhanced, 9, 75, 75)
-    
-    if upscale:
-        # Super Resolution Simulation
-        height, width = img_smooth.shape[:2]
-        img_upscaled = cv2.resize(img_smooth, (width * 2, height * 2), interpolation=cv2.INTER_LANCZOS4)
-        gaussian = cv2.GaussianBlur(img_upscaled, (9, 9), 10.0)
-        img_final = cv2.addWeighted(img_upscaled, 1.5, gaussian, -0.5, 0, img_upscaled)
+    # Model dimuat sekali per proses di thread latar belakang, sehingga halaman & upload
+    # sudah bisa dipakai selama menunggu. Semua sesi berbagi satu antrian inferensi
+    # (micro-batch); MBG_SERVER memakai layanan inferensi di proses/mesin lain (python layanan.py)
+    def muat():
+        if os.environ.get("MBG_SERVER"):
+            return layanan.KlienInferensi(os.environ["MBG_SERVER"])
+        if not os.path.exists("best.pt"):
+            raise FileNotFoundError("best.pt")
+        return layanan.LayananInferensi(pipeline.load_model("best.pt"))
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mbg-model")
+    future = executor.submit(muat)
+    executor.shutdown(wait=False)
+    return future
+
+def ambil_model():
+    """Model siap pakai; menunggu pemuatan di latar belakang jika belum selesai"""
+    future = load_model()
+    if not future.done():
+        with st.spinner("⏳ Memuat model deteksi..."):
+            future.exception()
+    try:
+        return future.result()
+    except FileNotFoundError:
+        load_model.clear()  # dicoba lagi pada rerun berikutnya
+        st.error("⚠️ File 'best.pt' tidak ditemukan! Pastikan file ada di folder proyek.")
+        st.stop()
+    except Exception as e:
+        # File rusak, dependency backend hilang, ekspor ONNX/OpenVINO gagal, server tidak terjangkau, ...
+        load_model.clear()
+        st.error(f"⚠️ Model gagal dimuat: {type(e).__name__}: {e}")
+        st.exception(e)
+        st.stop()
+
+@st.cache_resource
+def load_detection_cache():
+    # Deteksi mentah per citra, di-share antar sesi
+    return LRUCache(maxsize=32)
+
+@st.cache_resource
+def load_preprocess_cache():
+    # Hasil process_image + PNG download per (isi file, mode HD), di-share antar sesi.
+    # MBG_CACHE_DIR mengaktifkan tier spill ke disk.
+    return ByteBudgetCache(
+        max_bytes=int(os.environ.get("MBG_CACHE_MB", "512")) * 1024**2,
+        spill_dir=os.environ.get("MBG_CACHE_DIR"),
+    )
+
+# Pemuatan model dimulai sebelum UI dirender; database diinisialisasi saat pertama diakses
+load_model()
+
+# Laporan PDF: Future dari laporan.py dipantau lintas rerun, render halaman tidak ikut menunggu
+def unduh_laporan(future, label, file_name, **kwargs):
+    if not future.done():
+        tunggu_laporan(future)
+    elif future.exception() is not None:
+        st.error(f"⚠️ Laporan gagal dibuat: {future.exception()}")
     else:
-        img_final = img_smooth
-    return img_enhanced, img_final
-
-def smart_filter_boxes(boxes, class_names):
-    if len(boxes) == 0: return []
-    detections = []
-    
-    # Prioritas: Barang Spesifik > Barang Umum
-    for box in boxes:
-        x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-        conf = float(box.conf[0].cpu().numpy())
-        cls_id = int(box.cls[0].cpu().numpy())
-        label = class_names[cls_id]
-        
-        priority = 2
-        if label == "tray mbg": priority = 1
-        if "nasi" in label: priority = 3
-        
-        detections.append({"box": [x1, y1, x2, y2], "conf": conf, "label": label, "priority": priority, "keep": True})
-
-    # Cek Tumpukan
-    for i in range(len(detections)):
-        for j in range(len(detections)):
-            if i == j: continue
-            boxA = detections[i]["box"]; boxB = detections[j]["box"]
-            
-            xA = max(boxA[0], boxB[0]); yA = max(boxA[1], boxB[1])
-            xB = min(boxA[2], boxB[2]); yB = min(boxA[3], boxB[3])
-            
-            interArea = max(0, xB - xA) * max(0, yB - yA)
-            boxAArea = (boxA[2] - boxA[0]) * (boxA[3] - boxA[1])
-            boxBArea = (boxB[2] - boxB[0]) * (boxB[3] - boxB[1])
-            minArea = min(boxAArea, boxBArea)
-            overlap = interArea / minArea if minArea > 0 else 0
-            
-            if overlap > 0.5:
-                if detections[i]["priority"] < detections[j]["priority"]: detections[i]["keep"] = False
-                elif detections[i]["priority"] > detections[j]["priority"]: detections[j]["keep"] = False
-                elif detections[i]["priority"] == detections[j]["priority"]:
-                    if detections[i]["conf"] < detections[j]["conf"]: detections[i]["keep"] = False
-                    else: detections[j]["keep"] = False
-
-    return [d for d in detections if d["keep"]]
-
-# 5. USER INTERFACE (UI) UTAMA
+        st.download_button(label, data=future.result(), file_name=file_name, mime="application/pdf", **kwargs)
+
+@st.fragment(run_every=0.5)
+def tunggu_laporan(future):
+    if future.done():
+        st.rerun()  # seluruh halaman dirender ulang dengan tombol download
+    st.caption("⏳ Menyusun laporan PDF di latar belakang...")
+
+# 2. USER INTERFACE (UI) UTAMA
 st.title("Implementasi YOLOv8 untuk Deteksi Komposisi Menu MBG")
 st.markdown("Sistem monitoring otomatis untuk Program Makan Bergizi Gratis.")
 st.divider()
 
-tab1, tab2 = st.tabs(["📁 Upload File", "📸 Kamera Langsung"])
-source_image = None
+tab1, tab2, tab3 = st.tabs(["📁 Upload File", "📸 Kamera Langsung", "🎥 Stream Otomatis"])
+source_file = None
 if tab1:
     uploaded_file = tab1.file_uploader("Upload foto", type=["jpg", "png", "jpeg"])
-    if uploaded_file: source_image = Image.open(uploaded_file)
+    if uploaded_file: source_file = uploaded_file
 if tab2:
     camera_file = tab2.camera_input("Ambil foto")
-    if camera_file: source_image = Image.open(camera_file)
-
-if source_image:
+    if camera_file: source_file = camera_file
+
+# Mode stream: nampan dari kamera / file video dianalisis & disimpan otomatis sekali per nampan.
+# Streamlit tidak memberi tahu saat sesi ditutup; panel_stream memanggil stats() tiap detik,
+# sehingga stream yang tidak dipantau lagi selama MAKS_IDLE_STREAM detik berhenti sendiri.
+MAKS_IDLE_STREAM = 30
+
+@st.fragment(run_every=1.0)
+def panel_stream():
+    scanner = st.session_state.get("stream")
+    if scanner is None:
+        return
+    s = scanner.stats()
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("FPS Deteksi", f"{s['fps_deteksi']:.1f}")
+    c2.metric("Latensi p50 / p95", f"{s['latensi_p50_ms']:.0f} / {s['latensi_p95_ms']:.0f} ms")
+    c3.metric("Frame Dibuang", s["frame_dibuang"])
+    c4.metric("Nampan Tercatat", s["jumlah_nampan"])
+    if scanner.frame_anotasi is not None:
+        st.image(scanner.frame_anotasi, caption="Frame terakhir", channels="BGR", use_container_width=True)
+    for analisis in reversed(scanner.hasil[-5:]):
+        st.write(f"Nampan #{analisis['nampan_id']}: **{analisis['total_kalori']} kkal** | {analisis['status_db']} | "
+                 + ", ".join(x[0] for x in analisis["item_details"]))
+    if not scanner.berjalan:
+        st.info("Stream selesai.")
+
+with tab3:
+    stream_source = st.text_input("Sumber video", "0", help="Indeks kamera (0, 1, ...), path file video, atau URL RTSP/HTTP.")
+    col_mulai, col_stop = st.columns(2)
+    if col_mulai.button("▶️ Mulai Stream"):
+        if st.session_state.get("stream"): st.session_state["stream"].stop()
+        st.session_state["stream"] = stream.StreamScanner(ambil_model(), stream_source, conf=conf_threshold, iou=nms_threshold,
+                                                          maks_idle=MAKS_IDLE_STREAM).start()
+    if col_stop.button("⏹️ Hentikan Stream") and st.session_state.get("stream"):
+        st.session_state["stream"].stop()
+    panel_stream()
+
+if source_file:
     col1, col2 = st.columns([1, 1])
 
     # === KOLOM KIRI: PCD & DOWNLOAD GAMBAR ===
     with col1:
         st.subheader("1. Pra-pemrosesan Citra (PCD)")
-        st.image(source_image, caption="Citra Asli", use_container_width=True)
-
-        use_upscale = st.checkbox("✨ Aktifkan Mode HD (Contrast Enhancement & Sharpening)", value=False)
-        _, img_ready = process_image(source_image, upscale=use_upscale)
+        # Citra asli ditampilkan dari bytes upload (didekode oleh browser, bukan di server)
+        file_bytes = source_file.getvalue()
+        st.image(file_bytes, caption="Citra Asli", use_container_width=True)
+
+        use_tile = st.checkbox("🔍 Mode Tile (Deteksi Item Kecil pada Resolusi Asli)", value=False,
+                               help="Lebih ringan dari Mode HD: citra asli dipotong per tile seukuran input model.")
+        use_upscale = st.checkbox("✨ Aktifkan Mode HD (Contrast Enhancement & Sharpening)", value=False, disabled=use_tile) and not use_tile
+        # Praproses hanya dihitung ulang jika isi file / mode berubah. Dekode sekali ke BGR;
+        # mode tile butuh resolusi asli, mode lain cukup dekode JPEG tereduksi.
+        sisi_maks = None if use_tile else pipeline.SISI_MAKS
+        prep_cache = load_preprocess_cache()
+        pcd_key = pipeline.kunci_praproses(file_bytes, use_upscale, sisi_maks)
+        waktu_scan = metrik.WaktuScan()
+
+        def hitung_praproses():
+            with waktu_scan.tahap("praproses"):
+                return pipeline.praproses(pipeline.muat_citra(file_bytes, sisi_maks), upscale=use_upscale)
+        img_ready = prep_cache.get_or_compute(pcd_key, hitung_praproses)
+
+        # Praproses biasanya terjadi pada rerun sebelum tombol analisis ditekan;
+        # waktunya diingat per citra agar ikut tersimpan bersama scan
+        waktu_praproses = st.session_state.setdefault("waktu_praproses", {})
+        if "praproses" in waktu_scan.waktu: waktu_praproses[pcd_key] = waktu_scan.waktu["praproses"]
+        elif pcd_key in waktu_praproses: waktu_scan.waktu["praproses"] = waktu_praproses[pcd_key]
         
         with st.expander("👁️ Lihat Hasil Preprocessing", expanded=True):
-            st.image(img_ready, caption=f"Hasil Olah Citra ({'HD Mode' if use_upscale else 'Standard'})", use_container_width=True)
+            st.image(img_ready, caption=f"Hasil Olah Citra ({'HD Mode' if use_upscale else 'Standard'})", channels="BGR", use_container_width=True)
             st.info("Citra ini telah melalui proses Histogram Equalization untuk memperjelas fitur nasi dan lauk.")
 
         # Download Gambar HD
-        im_pil = Image.fromarray(img_ready)
-        buf = io.BytesIO()
-        im_pil.save(buf, format="PNG")
-        byte_im = buf.getvalue()
+        byte_im = prep_cache.get_or_compute(pcd_key + "|png", lambda: pipeline.encode_png(img_ready))
         st.download_button(label="⬇️ Download Citra Hasil PCD", data=byte_im, file_name="NutriScan_Enhanced.png", mime="image/png")
 
     # === KOLOM KANAN: AI & LAPORAN ===
     with col2:
         st.subheader("2. Hasil Deteksi Komposisi")
         
+        # Hasil analisis disimpan di session_state agar tetap tampil saat halaman rerun
+        # (mis. ketika tombol laporan ditekan), selama citra & slider tidak berubah.
+        hasil_key = (pcd_key, use_tile, conf_threshold, nms_threshold)
+
         if st.button("🚀 ANALISIS KOMPOSISI MENU", type="primary", use_container_width=True):
+            model = ambil_model()
             with st.spinner('Sedang melakukan segmentasi objek dan perhitungan gizi...'):
                 
-                img_for_ai = Image.fromarray(img_ready)
+                # PREDIKSI (model hanya jalan sekali per citra, slider cukup menyaring ulang)
+                deteksi = pipeline.deteksi_tile if use_tile else pipeline.deteksi_mentah
+                try:
+                    with waktu_scan.tahap("prediksi"):
+                        mentah = deteksi(model, img_ready, cache=load_detection_cache(), key=pcd_key)
+                        xyxy, confs, cls_ids = pipeline.saring_deteksi(mentah, conf_threshold, nms_threshold, max_det=50)
+                except layanan.AntrianPenuh:
+                    st.warning("⏳ Server inferensi sedang sibuk melayani terminal lain. Silakan coba lagi sebentar.")
+                    st.stop()
                 
-                # PREDIKSI
-                results = model.predict(img_for_ai, conf=conf_threshold, iou=nms_threshold, agnostic_nms=False, max_det=50)
-                
-                # FILTERING
-                filtered_detections = []
-                for box in results[0].boxes:
-                    x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                    conf = float(box.conf[0].cpu().numpy())
-                    cls_id = int(box.cls[0].cpu().numpy())
-                    label = model.names[cls_id]
-                    
-                    filtered_detections.append({
-                        "box": [x1, y1, x2, y2], 
-                        "conf": conf, 
-                        "label": label, 
-                        "priority": 1, 
-                        "keep": True
-                    })
+                # FILTERING & PERHITUNGAN GIZI
+                with waktu_scan.tahap("analisis"):
+                    analisis = pipeline.analisis_deteksi(xyxy, confs, cls_ids, model.names)
 
                 # VISUALISASI
-                img_res = np.array(img_ready)
-                total_kalori = 0
-                total_karbo, total_protein, total_lemak = 0, 0, 0
-                komposisi_tipe = {"Karbohidrat": 0, "Protein": 0, "Sayuran": 0, "Buah-buahan": 0, "Lainnya": 0}
-                found_types = set()
-                item_details = []
-
-                if len(filtered_detections) > 0:
-                    for item in filtered_detections:
+                with waktu_scan.tahap("gambar"):
+                    # Satu salinan untuk digambar (img_ready di cache bersifat read-only)
+                    img_res = img_ready.copy()
+                    for item in analisis["detections"]:
                         x1, y1, x2, y2 = map(int, item["box"])
                         label = item["label"]
                         
                         # Gambar Kotak
                         cv2.rectangle(img_res, (x1, y1), (x2, y2), (0, 255, 0), 2)
                         cv2.putText(img_res, label, (x1, y1-10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
-                        
-                        # Ambil Data Gizi
-                        default_info = {"label": label, "tipe": "Lainnya", "kalori": 0, "macros": (0,0,0)}
-                        info = database_gizi.get(label, default_info)
-                        
-                        total_kalori += info['kalori']
-                        c, p, f = info.get('macros', (0,0,0))
-                        total_karbo += c; total_protein += p; total_lemak += f
-                        
-                        item_details.append([info['label'], info['tipe'], f"{info['kalori']} kkal"])
-                        
-                        # Klasifikasi
-                        tipe = info['tipe']
-                        if "Karbohidrat" in tipe: komposisi_tipe["Karbohidrat"] += 1; found_types.add("Karbo")
-                        elif "Protein" in tipe: komposisi_tipe["Protein"] += 1; found_types.add("Protein")
-                        elif "Serat" in tipe or "Sayur" in label: komposisi_tipe["Sayuran"] += 1; found_types.add("Sayur")
-                        elif "Vitamin" in tipe or "Buah" in label: komposisi_tipe["Buah-buahan"] += 1; found_types.add("Buah")
-                        else: komposisi_tipe["Lainnya"] += 1
-
-                    st.image(img_res, caption="Hasil Deteksi AI", use_container_width=True)
-                    st.success(f"✅ Ditemukan {len(filtered_detections)} item.")
-
-                    # Dashboard Grafik
-                    st.write("### 📊 Statistik Gizi")
-                    tg1, tg2, tg3 = st.tabs(["Proporsi", "Kalori", "Makro"])
-                    
-                    with tg1:
-                        fig1, ax1 = plt.subplots(figsize=(4, 3))
-                        d_pie = {k: v for k, v in komposisi_tipe.items() if v > 0}
-                        if d_pie: ax1.pie(d_pie.values(), labels=d_pie.keys(), autopct='%1.1f%%', startangle=90)
-                        st.pyplot(fig1)
-                    with tg2:
-                        fig2, ax2 = plt.subplots(figsize=(5, 3))
-                        names = [x[0] for x in item_details]; cals = [int(x[2].split()[0]) for x in item_details]
-                        ax2.barh(names, cals, color='skyblue')
-                        st.pyplot(fig2)
-                    with tg3:
-                        fig3, ax3 = plt.subplots(figsize=(4, 3))
-                        ax3.bar(['Karbo', 'Protein', 'Lemak'], [total_karbo, total_protein, total_lemak], color=['#F4D03F', '#E74C3C', '#5DADE2'])
-                        st.pyplot(fig3)
-
-                    # Logika Rekomendasi (Standar MBG)
-                    rekomendasi = []
-                    if total_kalori < 400: rekomendasi.append("- Total Kalori di bawah standar makan siang MBG (Min. 400 kkal).")
-                    if "Sayur" not in found_types: rekomendasi.append("- Komponen Sayuran tidak ditemukan. Menu tidak seimbang.")
-                    if "Protein" not in found_types: rekomendasi.append("- Komponen Lauk/Protein tidak ditemukan.")
-                    if "Buah" not in found_types: rekomendasi.append("- Komponen Buah tidak ditemukan.")
-                    
-                    if not rekomendasi: 
-                        status_text = "✅ Menu MEMENUHI Standar Gizi Program MBG (4 Sehat 5 Sempurna)."
-                    else:
-                        status_text = "⚠️ Menu BELUM MEMENUHI Standar Lengkap."
-                        
-                    st.info(status_text)
-
-                    # --- SAVE DATABASE ---
-                    status_db = "Seimbang" if not rekomendasi else "Kurang Lengkap"
-                    database.simpan_scan(total_kalori, len(filtered_detections), status_db, item_details)
-
-                    # Generate PDF
-                    with tempfile.TemporaryDirectory() as tmpdirname:
-                        img_path = os.path.join(tmpdirname, "detected.jpg")
-                        cv2.imwrite(img_path, cv2.cvtColor(img_res, cv2.COLOR_RGB2BGR))
-                        chart1_path = os.path.join(tmpdirname, "chart1.png"); fig1.savefig(chart1_path)
-                        chart3_path = os.path.join(tmpdirname, "chart3.png"); fig3.savefig(chart3_path)
-                        
-                        pdf = PDF()
-                        pdf.add_page()
-                        pdf.set_font("Arial", size=12)
-                        pdf.cell(0, 10, f"Tanggal: {datetime.now().strftime('%d-%m-%Y')}", ln=True)
-                        pdf.cell(0, 10, f"Total Kalori: {total_kalori} kkal", ln=True)
-                        pdf.ln(5)
-                        
-                        pdf.set_font("Arial", 'B', 12); pdf.cell(0, 10, "1. HASIL DETEKSI VISUAL", ln=True)
-                        pdf.image(img_path, x=10, w=100); pdf.ln(5)
-                        
-                        pdf.cell(0, 10, "2. RINCIAN KOMPOSISI", ln=True)
-                        pdf.set_font("Arial", 'B', 10)
-                        pdf.cell(70, 10, "Item Menu", 1); pdf.cell(70, 10, "Kategori", 1); pdf.cell(40, 10, "Kalori", 1); pdf.ln()
-                        pdf.set_font("Arial", size=10)
-                        for item in item_details:
-                            pdf.cell(70, 10, item[0], 1); pdf.cell(70, 10, item[1], 1); pdf.cell(40, 10, item[2], 1); pdf.ln()
-                        
-                        pdf.ln(10)
-                        pdf.set_font("Arial", 'B', 12); pdf.cell(0, 10, "3. GRAFIK KOMPOSISI", ln=True)
-                        y_pos = pdf.get_y()
-                        pdf.image(chart1_path, x=10, y=y_pos, w=80); pdf.image(chart3_path, x=100, y=y_pos, w=80)
-                        pdf.ln(65)
-                        
-                        pdf.cell(0, 10, "4. REKOMENDASI", ln=True)
-                        pdf.set_font("Arial", size=11)
-                        if not rekomendasi: pdf.multi_cell(0, 7, "- Tidak ada catatan. Menu sudah sesuai standar.")
-                        for rek in rekomendasi: pdf.multi_cell(0, 7, rek)
-                        
-                        pdf_bytes = pdf.output(dest='S').encode('latin-1')
-                        st.divider()
-                        st.download_button("📄 DOWNLOAD LAPORAN HASIL (PDF)", data=pdf_bytes, file_name="Laporan_Deteksi_MBG.pdf", mime="application/pdf", type="primary")
 
+                # Grafik dirender sekali per scan; bytes yang sama dipakai UI & laporan PDF
+                with waktu_scan.tahap("grafik"):
+                    grafik_scan = grafik.grafik_scan(analisis)
+
+                # --- SAVE DATABASE --- (bersama waktu per tahap scan ini)
+                metrik.catat_scan(len(analisis["detections"]))
+                simpan = None  # Future: gagal simpan dilaporkan ke sesi yang menyimpan saja
+                if analisis["detections"]:
+                    with metrik.ukur("simpan"):
+                        simpan = database.simpan_scan(*pipeline.argumen_simpan(analisis), waktu_tahap=waktu_scan.waktu)
+
+                st.session_state["hasil"] = {"key": hasil_key, "analisis": analisis, "img_res": img_res,
+                                             "grafik": grafik_scan, "laporan": None, "simpan": simpan}
+
+        hasil = st.session_state.get("hasil")
+        if hasil and hasil["key"] == hasil_key:
+            analisis = hasil["analisis"]
+            img_res = hasil["img_res"]
+            filtered_detections = analisis["detections"]
+            rekomendasi = analisis["rekomendasi"]
+
+            if len(filtered_detections) > 0:
+                st.image(img_res, caption="Hasil Deteksi AI", channels="BGR", use_container_width=True)
+                st.success(f"✅ Ditemukan {len(filtered_detections)} item.")
+
+                # Dashboard Grafik
+                st.write("### 📊 Statistik Gizi")
+                tg1, tg2, tg3 = st.tabs(["Proporsi", "Kalori", "Makro"])
+                
+                with tg1:
+                    st.image(hasil["grafik"]["proporsi"], use_container_width=True)
+                with tg2:
+                    st.image(hasil["grafik"]["kalori"], use_container_width=True)
+                with tg3:
+                    st.image(hasil["grafik"]["makro"], use_container_width=True)
+
+                if not rekomendasi: 
+                    status_text = "✅ Menu MEMENUHI Standar Gizi Program MBG (4 Sehat 5 Sempurna)."
                 else:
-                    st.error("❌ Objek tidak terdeteksi. Silakan atur pencahayaan atau geser slider Threshold.")
+                    status_text = "⚠️ Menu BELUM MEMENUHI Standar Lengkap."
+                    
+                st.info(status_text)
+
+                # Laporan PDF dibuat di thread latar belakang, hanya jika diminta
+                st.divider()
+                if hasil["laporan"] is None:
+                    if st.button("📄 BUAT LAPORAN HASIL (PDF)", use_container_width=True):
+                        hasil["laporan"] = laporan.minta_pdf_scan(img_res, analisis, hasil["grafik"])
+                if hasil["laporan"] is not None:
+                    unduh_laporan(hasil["laporan"], "📄 DOWNLOAD LAPORAN HASIL (PDF)", "Laporan_Deteksi_MBG.pdf", type="primary")
+
+            else:
+                st.error("❌ Objek tidak terdeteksi. Silakan atur pencahayaan atau geser slider Threshold.")
 
 # --- BOTTOM : RIWAYAT SCAN ---
 st.divider()
-st.subheader("📜 Riwayat Scan Hari Ini")
+st.subheader("📜 Riwayat Scan")
+scan_terakhir = st.session_state.get("hasil")
+if scan_terakhir and scan_terakhir["simpan"] is not None:
+    try:
+        scan_terakhir["simpan"].result()
+    except database.GagalSimpan as e:
+        st.error(f"⚠️ {e}")
+periode = st.radio("Periode", ["Hari Ini", "7 Hari", "30 Hari"], horizontal=True, label_visibility="collapsed")
 
 # database.py
-df_history = database.ambil_riwayat_hari_ini()
-
-if not df_history.empty:
-    st.dataframe(df_history, use_container_width=True, hide_index=True)
+if periode == "Hari Ini":
+    df_history = database.ambil_riwayat_hari_ini()
+
+    if not df_history.empty:
+        st.dataframe(df_history, use_container_width=True, hide_index=True)
+
+        # Laporan gabungan semua scan hari ini (dibuat di latar belakang saat diminta)
+        # (laporan lama dibuang jika sudah ada scan baru)
+        laporan_harian = st.session_state.get("laporan_harian")
+        if laporan_harian and laporan_harian[0] != len(df_history):
+            laporan_harian = None
+        if st.button("🗂️ Buat Laporan Harian (PDF)"):
+            laporan_harian = (len(df_history), laporan.minta_pdf_harian())
+        st.session_state["laporan_harian"] = laporan_harian
+        if laporan_harian:
+            unduh_laporan(laporan_harian[1], "⬇️ Download Laporan Harian (PDF)", "Laporan_Harian_MBG.pdf")
+    else:
+        st.info("Belum ada data scan hari ini.")
 else:
-    st.info("Belum ada data scan hari ini.")
\ No newline at end of file
+    # Minggu/bulan dibaca dari tabel rekap (bukan data scan mentah)
+    hari = 7 if periode == "7 Hari" else 30
+    df_rekap = database.ambil_rekap_harian(hari)
+
+    if not df_rekap.empty:
+        st.dataframe(df_rekap, use_container_width=True, hide_index=True)
+        st.write("#### 🍽️ Rekap per Menu")
+        st.dataframe(database.ambil_rekap_menu(hari), use_container_width=True, hide_index=True)
+    else:
+        st.info(f"Belum ada data scan dalam {hari} hari terakhir.")
+
+# --- SIDEBAR: PANEL PERFORMA (opsional) ---
+# Dirender paling akhir agar waktu scan pada rerun ini ikut terhitung
+if tampil_performa:
+    with st.sidebar:
+        st.divider()
+        st.write("#### 📊 Performa Pipeline")
+        tahap, counter = metrik.ringkasan()
+        c1, c2, c3 = st.columns(3)
+        c1.metric("Scan", counter["scan"])
+        c2.metric("Item", counter["deteksi"])
+        c3.metric("Kosong", counter["scan_kosong"])
+        if tahap:
+            st.dataframe(
+                [{"Tahap": nama, "n": r["n"], "p50 (ms)": round(r["p50_ms"], 1), "p95 (ms)": round(r["p95_ms"], 1)}
+                 for nama, r in tahap.items()],
+                use_container_width=True, hide_index=True)
+        st.caption("Sejak aplikasi dimulai. Rata-rata 7 hari dari database:")
+        st.dataframe(database.ambil_waktu_tahap(7), use_container_width=True, hide_index=True)
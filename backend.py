@@ -0,0 +1,259 @@
+"""Backend inferensi CPU di balik pipeline.load_model (PyTorch, ONNX Runtime, OpenVINO).
+
+best.pt diekspor sekali ke format backend yang dipilih (hasil ekspor dipakai ulang
+selama tidak lebih tua dari best.pt), lalu dimuat lewat ultralytics YOLO sehingga
+API predict / names tetap sama. Backend dipilih lewat konfigurasi:
+
+    MBG_BACKEND=pytorch|onnx|openvino   (default: pytorch)
+    MBG_INT8=1                          kuantisasi INT8
+    MBG_KALIBRASI=foto_kalibrasi/       folder foto nampan untuk kalibrasi INT8
+
+Ekspor & cek paritas deteksi antar backend dari CLI:
+
+    python backend.py export --backend onnx --int8 --kalibrasi foto_kalibrasi/
+    python backend.py paritas foto_uji/ --backend pytorch onnx openvino
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+import pipeline
+
+BACKEND = ("pytorch", "onnx", "openvino")
+MAKS_KALIBRASI = 300
+BATCH_PARITAS = 8  # paritas diuji per batch seperti scan_batch / mode tile / layanan
+
+
+def konfigurasi():
+    """(backend, int8, folder kalibrasi) dari environment"""
+    backend = os.environ.get("MBG_BACKEND", "pytorch").lower()
+    if backend not in BACKEND:
+        raise ValueError(f"MBG_BACKEND tidak dikenal: {backend} (pilihan: {', '.join(BACKEND)})")
+    return backend, os.environ.get("MBG_INT8", "0") == "1", os.environ.get("MBG_KALIBRASI")
+
+
+def path_ekspor(path, backend, int8=False):
+    """Lokasi hasil ekspor best.pt untuk backend (mengikuti penamaan ultralytics)"""
+    dasar = os.path.splitext(path)[0]
+    if backend == "onnx":
+        return f"{dasar}_int8.onnx" if int8 else f"{dasar}.onnx"
+    if backend == "openvino":
+        return f"{dasar}_int8_openvino_model" if int8 else f"{dasar}_openvino_model"
+    return path
+
+
+def _masih_baru(hasil, sumber):
+    return os.path.exists(hasil) and os.path.getmtime(hasil) >= os.path.getmtime(sumber)
+
+
+def _batch_dinamis(hasil, backend):
+    """True jika dimensi batch input model hasil ekspor tidak dipatok (bisa menerima batch > 1)"""
+    if backend == "onnx":
+        import onnxruntime
+        sesi = onnxruntime.InferenceSession(hasil, providers=["CPUExecutionProvider"])
+        return not isinstance(sesi.get_inputs()[0].shape[0], int)
+    import openvino
+    xml = next(os.path.join(hasil, f) for f in os.listdir(hasil) if f.endswith(".xml"))
+    return openvino.Core().read_model(xml).inputs[0].get_partial_shape()[0].is_dynamic
+
+
+def _bisa_dipakai(hasil, sumber, backend):
+    """Hasil ekspor lama dipakai ulang jika masih baru dan sudah berbatch dinamis"""
+    return _masih_baru(hasil, sumber) and _batch_dinamis(hasil, backend)
+
+
+def _file_kalibrasi(folder):
+    if not folder or not os.path.isdir(folder):
+        raise ValueError("Kuantisasi INT8 butuh folder foto kalibrasi (MBG_KALIBRASI / --kalibrasi).")
+    paths = pipeline.kumpulkan_file([folder])[:MAKS_KALIBRASI]
+    if not paths:
+        raise ValueError(f"Tidak ada citra kalibrasi di {folder}")
+    return paths
+
+
+def _muat(path):
+    """Citra siap deteksi (BGR, sudah dipraproses) seperti saat scan"""
+    with open(path, "rb") as f:
+        return pipeline.praproses(pipeline.muat_citra(f.read()))
+
+
+def _letterbox(img_bgr, ukuran):
+    """Resize menjaga rasio + padding abu-abu seperti praproses ultralytics, hasil NCHW RGB float32"""
+    h, w = img_bgr.shape[:2]
+    skala = ukuran / max(h, w)
+    nh, nw = round(h * skala), round(w * skala)
+    kanvas = np.full((ukuran, ukuran, 3), 114, dtype=np.uint8)
+    top, left = (ukuran - nh) // 2, (ukuran - nw) // 2
+    kanvas[top:top + nh, left:left + nw] = cv2.resize(img_bgr, (nw, nh), interpolation=cv2.INTER_LINEAR)
+    return kanvas[..., ::-1].transpose(2, 0, 1)[None].astype(np.float32) / 255.0
+
+
+def _kuantisasi_onnx(path_fp32, path_int8, folder_kalibrasi, ukuran):
+    """Kuantisasi statis INT8 (QDQ) dengan ONNX Runtime, dikalibrasi pada foto nampan asli"""
+    import onnxruntime
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+
+    nama_input = onnxruntime.InferenceSession(path_fp32, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+    paths = _file_kalibrasi(folder_kalibrasi)
+
+    class Pembaca(CalibrationDataReader):
+        def __init__(self):
+            self._sisa = iter(paths)
+
+        def get_next(self):
+            path = next(self._sisa, None)
+            if path is None:
+                return None
+            return {nama_input: _letterbox(_muat(path), ukuran)}
+
+    quantize_static(path_fp32, path_int8, Pembaca(), quant_format=QuantFormat.QDQ,
+                    activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8, per_channel=True)
+
+
+def _yaml_kalibrasi(folder, names):
+    """Dataset yaml sementara untuk kalibrasi INT8 OpenVINO (NNCF) lewat ultralytics"""
+    _file_kalibrasi(folder)
+    folder = os.path.abspath(folder)
+    fd, path = tempfile.mkstemp(suffix=".yaml")
+    with os.fdopen(fd, "w") as f:
+        f.write(f"path: {folder}\ntrain: {folder}\nval: {folder}\nnames:\n")
+        for cls_id, label in names.items():
+            f.write(f"  {cls_id}: {label!r}\n")
+    return path
+
+
+def ekspor(path="best.pt", backend="onnx", int8=False, kalibrasi=None):
+    """Mengekspor best.pt ke backend (dilewati jika hasil ekspor masih baru), mengembalikan path-nya"""
+    hasil = path_ekspor(path, backend, int8)
+    if backend == "pytorch" or _bisa_dipakai(hasil, path, backend):
+        return hasil
+
+    from ultralytics import YOLO
+    model = YOLO(path)
+    ukuran = pipeline.ukuran_input(model)
+    # Batch dinamis: scan_batch, mode tile, dan micro-batch layanan mengirim banyak citra
+    # sekaligus, sedangkan model berbatch statis 1 menolak input batch N
+    if backend == "onnx":
+        fp32 = path_ekspor(path, "onnx")
+        if not _bisa_dipakai(fp32, path, "onnx"):
+            fp32 = model.export(format="onnx", imgsz=ukuran, dynamic=True, simplify=True)
+        if int8:
+            _kuantisasi_onnx(fp32, hasil, kalibrasi, ukuran)
+    else:
+        data = _yaml_kalibrasi(kalibrasi, model.names) if int8 else None
+        try:
+            keluaran = model.export(format="openvino", imgsz=ukuran, int8=int8, data=data, dynamic=True)
+        finally:
+            if data: os.remove(data)
+        if os.path.abspath(keluaran) != os.path.abspath(hasil):
+            shutil.rmtree(hasil, ignore_errors=True)
+            shutil.move(keluaran, hasil)
+    return hasil
+
+
+def pemanasan(model, ukuran=None):
+    """Satu inferensi dummy agar scan pertama tidak menanggung inisialisasi runtime"""
+    ukuran = ukuran or pipeline.ukuran_input(model)
+    model.predict(np.zeros((ukuran, ukuran, 3), dtype=np.uint8), verbose=False)
+    return model
+
+
+def muat_model(path="best.pt", backend=None, int8=None, kalibrasi=None, warmup=True):
+    """Memuat model untuk backend terpilih (default dari konfigurasi environment)"""
+    from ultralytics import YOLO
+
+    backend_env, int8_env, kalibrasi_env = konfigurasi()
+    backend = backend or backend_env
+    int8 = int8_env if int8 is None else int8
+    if backend == "pytorch":
+        model = YOLO(path)
+    else:
+        model = YOLO(ekspor(path, backend, int8, kalibrasi or kalibrasi_env), task="detect")
+    return pemanasan(model) if warmup else model
+
+
+# CEK PARITAS
+def cek_paritas(paths, backends, path="best.pt", int8=False, conf=0.15, iou=0.45, iou_cocok=0.5):
+    """Membandingkan deteksi tiap backend terhadap backend pertama (acuan) pada citra yang sama.
+
+    Citra dikirim per batch BATCH_PARITAS (seperti pemakaian sebenarnya), sehingga
+    model yang hanya menerima batch 1 ikut ketahuan. Deteksi dianggap cocok jika
+    kelasnya sama dan IoU >= iou_cocok. Mengembalikan
+    dict per backend: ms/citra, rasio deteksi acuan yang ditemukan, deteksi tambahan,
+    selisih confidence maksimum, dan jumlah citra dengan total kalori sama.
+    """
+    citra = [_muat(p) for p in paths]
+
+    deteksi, laporan = {}, {}
+    for backend in backends:
+        model = muat_model(path, backend, int8=int8 and backend != "pytorch")
+        mulai = time.perf_counter()
+        mentah = []
+        for i in range(0, len(citra), BATCH_PARITAS):
+            mentah.extend(pipeline.prediksi_mentah(model, citra[i:i + BATCH_PARITAS]))
+        deteksi[backend] = [pipeline.saring_deteksi(m, conf, iou) for m in mentah]
+        ms = (time.perf_counter() - mulai) * 1000 / max(len(citra), 1)
+        kalori = [pipeline.analisis_deteksi(*d, model.names)["total_kalori"] for d in deteksi[backend]]
+        laporan[backend] = {"ms_per_citra": ms, "kalori": kalori}
+
+    acuan = backends[0]
+    for backend in backends:
+        cocok = total_acuan = tambahan = 0
+        selisih_conf = 0.0
+        for (xa, ca, ka), (xb, cb, kb) in zip(deteksi[acuan], deteksi[backend]):
+            total_acuan += len(ca)
+            dipakai = set()
+            if len(ca) and len(cb):
+                m = pipeline.iou_matriks(xa, xb) * (ka[:, None] == kb[None, :])
+                for i in range(len(ca)):
+                    j = int(np.argmax(m[i]))
+                    if m[i, j] >= iou_cocok and j not in dipakai:
+                        dipakai.add(j)
+                        cocok += 1
+                        selisih_conf = max(selisih_conf, abs(float(ca[i]) - float(cb[j])))
+            tambahan += len(cb) - len(dipakai)
+        laporan[backend].update(
+            cocok=cocok / total_acuan if total_acuan else 1.0, tambahan=tambahan, selisih_conf_maks=selisih_conf,
+            kalori_sama=sum(a == b for a, b in zip(laporan[acuan]["kalori"], laporan[backend]["kalori"])),
+        )
+    return laporan
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ekspor model MBG ke backend CPU dan cek paritas deteksi.")
+    sub = parser.add_subparsers(dest="perintah", required=True)
+
+    p_ekspor = sub.add_parser("export", help="Ekspor best.pt ke ONNX Runtime / OpenVINO")
+    p_ekspor.add_argument("--backend", choices=BACKEND[1:], default="onnx")
+    p_paritas = sub.add_parser("paritas", help="Bandingkan deteksi antar backend (backend pertama = acuan)")
+    p_paritas.add_argument("inputs", nargs="+", help="File citra dan/atau folder uji")
+    p_paritas.add_argument("--backend", nargs="+", choices=BACKEND, default=["pytorch", "onnx"])
+    p_paritas.add_argument("--conf", type=float, default=0.15, help="Ambang confidence (default: 0.15)")
+    p_paritas.add_argument("--iou", type=float, default=0.45, help="Ambang IoU NMS (default: 0.45)")
+    for p in (p_ekspor, p_paritas):
+        p.add_argument("--model", default="best.pt", help="Path bobot YOLOv8 (default: best.pt)")
+        p.add_argument("--int8", action="store_true", help="Kuantisasi INT8 (butuh --kalibrasi saat ekspor)")
+    p_ekspor.add_argument("--kalibrasi", default=None, help="Folder foto nampan untuk kalibrasi INT8")
+    args = parser.parse_args(argv)
+
+    if args.perintah == "export":
+        print(f"Model diekspor ke {ekspor(args.model, args.backend, args.int8, args.kalibrasi)}")
+        return
+
+    paths = pipeline.kumpulkan_file(args.inputs)
+    if not paths:
+        parser.error("Tidak ada citra yang ditemukan.")
+    laporan = cek_paritas(paths, args.backend, args.model, args.int8, args.conf, args.iou)
+    print(f"{'backend':>10} {'ms/citra':>9} {'cocok':>7} {'tambahan':>9} {'d_conf':>7} {'kalori sama':>12}")
+    for backend, r in laporan.items():
+        print(f"{backend:>10} {r['ms_per_citra']:>9.1f} {r['cocok']:>6.1%} {r['tambahan']:>9} "
+              f"{r['selisih_conf_maks']:>7.3f} {r['kalori_sama']:>6}/{len(paths)}")
+
+
+if __name__ == "__main__":
+    main()
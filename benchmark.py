@@ -0,0 +1,437 @@
+"""Benchmark komponen pipeline (tanpa GPU, tanpa jaringan, best.pt opsional).
+
+Setiap tahap diukur terpisah pada nampan sintetis yang dibuat ulang dengan seed
+tetap: praproses (std & HD), inferensi, smart filter, perhitungan gizi, grafik,
+PDF, simpan_scan / ambil_riwayat_hari_ini pada tabel yang terus membesar, serta
+impor dingin modul aplikasi.
+Jika best.pt (atau ultralytics) tidak tersedia, inferensi memakai model pengganti
+berbasis segmentasi warna sehingga tahap lain tetap mendapat deteksi realistis.
+
+    python benchmark.py                               # semua grup
+    python benchmark.py praproses gizi --repeat 20
+    python benchmark.py --json hasil.json             # simpan hasil
+    python benchmark.py --simpan-baseline             # tulis benchmark_baseline.json
+    python benchmark.py --baseline benchmark_baseline.json --toleransi 0.25
+
+Hasil dibandingkan dengan baseline (default benchmark_baseline.json bila ada);
+tahap yang melambat lebih dari toleransi ditandai REGRESI dan exit code = 1.
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+from PIL import Image
+
+import database
+import pipeline
+from gizi import database_gizi, hitung_gizi, tabel_gizi
+from pipeline import prioritas_kelas, smart_filter_indeks
+
+NAMA_KELAS_DUMMY = {0: "nasi putih", 1: "ayam goreng", 2: "sayur sop", 3: "tempe goreng", 4: "buah pisang", 5: "tray mbg"}
+BASELINE = "benchmark_baseline.json"
+TOLERANSI = 0.25
+SELISIH_MIN_MS = 0.05  # selisih di bawah ini dianggap derau pengukuran
+
+# Warna (BGR) menu pada nampan sintetis, juga dipakai model pengganti untuk mendeteksinya
+WARNA_MENU = {
+    "nasi putih": (235, 235, 235),
+    "ayam goreng": (40, 90, 160),
+    "sayur bayam": (40, 150, 40),
+    "tempe goreng": (110, 170, 200),
+    "buah jeruk": (20, 140, 250),
+}
+WARNA_NAMPAN = (150, 150, 150)
+TOLERANSI_WARNA = 40
+
+
+def buat_kotak_acak(n, rng, ukuran_citra=640):
+    """Kotak acak yang banyak bertumpuk, meniru nampan padat lauk"""
+    pusat = rng.uniform(0.2, 0.8, size=(n, 2)) * ukuran_citra
+    wh = rng.uniform(0.05, 0.3, size=(n, 2)) * ukuran_citra
+    xyxy = np.concatenate([pusat - wh / 2, pusat + wh / 2], axis=1).astype(np.float32)
+    confs = rng.uniform(0.05, 1.0, size=n).astype(np.float32)
+    cls_ids = rng.integers(0, len(NAMA_KELAS_DUMMY), size=n)
+    return xyxy, confs, cls_ids
+
+
+def smart_filter_lama(xyxy, confs, cls_ids, class_names):
+    """Implementasi awal (loop Python O(n^2)) sebagai pembanding"""
+    detections = []
+    for (x1, y1, x2, y2), conf, cls_id in zip(xyxy, confs, cls_ids):
+        label = class_names[int(cls_id)]
+        priority = 2
+        if label == "tray mbg": priority = 1
+        if "nasi" in label: priority = 3
+        detections.append({"box": [x1, y1, x2, y2], "conf": float(conf), "priority": priority, "keep": True})
+
+    for i in range(len(detections)):
+        for j in range(len(detections)):
+            if i == j: continue
+            boxA = detections[i]["box"]; boxB = detections[j]["box"]
+            xA = max(boxA[0], boxB[0]); yA = max(boxA[1], boxB[1])
+            xB = min(boxA[2], boxB[2]); yB = min(boxA[3], boxB[3])
+            interArea = max(0, xB - xA) * max(0, yB - yA)
+            boxAArea = (boxA[2] - boxA[0]) * (boxA[3] - boxA[1])
+            boxBArea = (boxB[2] - boxB[0]) * (boxB[3] - boxB[1])
+            minArea = min(boxAArea, boxBArea)
+            overlap = interArea / minArea if minArea > 0 else 0
+            if overlap > 0.5:
+                if detections[i]["priority"] < detections[j]["priority"]: detections[i]["keep"] = False
+                elif detections[i]["priority"] > detections[j]["priority"]: detections[j]["keep"] = False
+                elif detections[i]["conf"] < detections[j]["conf"]: detections[i]["keep"] = False
+                else: detections[j]["keep"] = False
+
+    return np.array([i for i, d in enumerate(detections) if d["keep"]], dtype=np.intp)
+
+
+def ukur(fn, repeat):
+    """Median waktu eksekusi fn() dalam milidetik"""
+    waktu = []
+    for _ in range(repeat):
+        mulai = time.perf_counter()
+        fn()
+        waktu.append((time.perf_counter() - mulai) * 1000)
+    return float(np.median(waktu))
+
+
+# DATA & MODEL SINTETIS
+def buat_nampan_sintetis(rng, h=1080, w=1440):
+    """Foto nampan sintetis (BGR): nampan abu-abu, menu berwarna per sekat, derau kamera"""
+    img = np.full((h, w, 3), 60, dtype=np.uint8)
+    cv2.rectangle(img, (w // 20, h // 20), (w - w // 20, h - h // 20), WARNA_NAMPAN, -1)
+    sekat = [(x, y) for y in (0.3, 0.7) for x in (0.2, 0.5, 0.8)]
+    for (fx, fy), warna in zip(sekat, rng.permutation(list(WARNA_MENU.values()))):
+        pusat = (int(fx * w + rng.integers(-30, 30)), int(fy * h + rng.integers(-30, 30)))
+        sumbu = (int(w * rng.uniform(0.08, 0.12)), int(h * rng.uniform(0.1, 0.15)))
+        cv2.ellipse(img, pusat, sumbu, float(rng.uniform(0, 180)), 0, 360, tuple(int(c) for c in warna), -1)
+    derau = rng.normal(0, 8, img.shape)
+    return np.clip(img + derau, 0, 255).astype(np.uint8)
+
+
+def encode_jpeg(img_bgr, quality=90):
+    return cv2.imencode(".jpg", img_bgr, [cv2.IMWRITE_JPEG_QUALITY, quality])[1].tobytes()
+
+
+class _Tensor(np.ndarray):
+    """Array dengan cpu()/numpy() seperti tensor torch di results[i].boxes"""
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.view(np.ndarray)
+
+
+class ModelPengganti:
+    """Pengganti YOLO untuk benchmark: mendeteksi menu sintetis lewat segmentasi warna.
+
+    Antarmukanya (names, overrides, predict -> results[i].boxes) sama dengan YOLO
+    sehingga jalur pipeline.prediksi_mentah / boxes_ke_array ikut terukur.
+    """
+
+    def __init__(self, ukuran=640):
+        self.names = dict(enumerate(database_gizi))
+        self.overrides = {"imgsz": ukuran}
+        id_kelas = {nama: i for i, nama in self.names.items()}
+        self._warna = [(id_kelas[nama], np.array(warna)) for nama, warna in WARNA_MENU.items()]
+        self._warna.append((id_kelas["tray mbg"], np.array(WARNA_NAMPAN)))
+
+    def _deteksi(self, img_bgr):
+        h, w = img_bgr.shape[:2]
+        ukuran = self.overrides["imgsz"]
+        skala = ukuran / max(h, w)
+        kecil = cv2.resize(img_bgr, (round(w * skala), round(h * skala)), interpolation=cv2.INTER_AREA)
+        kotak, skor, kelas = [], [], []
+        for cls_id, warna in self._warna:
+            mask = cv2.inRange(kecil, warna - TOLERANSI_WARNA, warna + TOLERANSI_WARNA)
+            _, _, stats, _ = cv2.connectedComponentsWithStats(mask)
+            for x, y, bw, bh, luas in stats[1:]:
+                if luas < 50:
+                    continue
+                kotak.append(np.array([x, y, x + bw, y + bh]) / skala)
+                skor.append(min(0.99, 0.5 + luas / (bw * bh) / 2))
+                kelas.append(cls_id)
+        return (np.array(kotak, dtype=np.float32).reshape(-1, 4), np.array(skor, dtype=np.float32),
+                np.array(kelas, dtype=np.float32))
+
+    def predict(self, source, conf=0.25, max_det=300, **kwargs):
+        results = []
+        for img in source if isinstance(source, list) else [source]:
+            xyxy, confs, cls_ids = self._deteksi(img)
+            keep = np.flatnonzero(confs > conf)[:max_det]
+            boxes = SimpleNamespace(xyxy=xyxy[keep].view(_Tensor), conf=confs[keep].view(_Tensor),
+                                    cls=cls_ids[keep].view(_Tensor))
+            results.append(SimpleNamespace(boxes=boxes))
+        return results
+
+
+def muat_model_benchmark(path="best.pt", pengganti=False):
+    """(model, keterangan): best.pt bila tersedia, selain itu ModelPengganti"""
+    if not pengganti and os.path.exists(path):
+        try:
+            return pipeline.load_model(path), path
+        except ImportError:
+            pass
+    return ModelPengganti(), "pengganti"
+
+
+@contextlib.contextmanager
+def db_sementara():
+    """Mengarahkan database.DB_NAME ke file sementara selama benchmark"""
+    lama = database.DB_NAME
+    database.tutup()
+    with tempfile.TemporaryDirectory() as folder:
+        database.DB_NAME = os.path.join(folder, "benchmark.db")
+        try:
+            yield
+        finally:
+            database.tutup()
+            database.DB_NAME = lama
+
+
+def _cetak(hasil):
+    for nama, ms in hasil.items():
+        print(f"{nama:>32} {ms:>12.3f} ms")
+    return hasil
+
+
+# GRUP BENCHMARK (masing-masing mengembalikan {nama: ms})
+def bench_smart_filter(konteks, repeat, seed=0):
+    """Skala smart filter terhadap max_det: loop Python vs versi vektor, plus smart_filter_boxes"""
+    rng = np.random.default_rng(seed)
+    priorities = prioritas_kelas(NAMA_KELAS_DUMMY)
+    hasil = {}
+    print(f"{'max_det':>8} {'lama (ms)':>12} {'vektor (ms)':>12} {'speedup':>9}  sama {'boxes (ms)':>11}")
+    for n in (10, 25, 50, 100, 200, 300):
+        xyxy, confs, cls_ids = buat_kotak_acak(n, rng)
+        boxes = SimpleNamespace(xyxy=xyxy.view(_Tensor), conf=confs.view(_Tensor), cls=cls_ids.view(_Tensor))
+        keep_lama = smart_filter_lama(xyxy, confs, cls_ids, NAMA_KELAS_DUMMY)
+        keep_baru = smart_filter_indeks(xyxy, confs, cls_ids, priorities)
+        t_lama = ukur(lambda: smart_filter_lama(xyxy, confs, cls_ids, NAMA_KELAS_DUMMY), max(1, repeat // 10))
+        t_baru = ukur(lambda: smart_filter_indeks(xyxy, confs, cls_ids, priorities), repeat)
+        t_boxes = ukur(lambda: pipeline.smart_filter_boxes(boxes, NAMA_KELAS_DUMMY), repeat)
+        sama = np.array_equal(keep_lama, keep_baru)
+        print(f"{n:>8} {t_lama:>12.3f} {t_baru:>12.3f} {t_lama / t_baru:>8.1f}x  {'ya' if sama else 'TIDAK':<4} "
+              f"{t_boxes:>11.3f}")
+        hasil[f"indeks_{n}"] = t_baru
+        hasil[f"boxes_{n}"] = t_boxes
+    return hasil
+
+
+def bench_praproses(konteks, repeat):
+    """process_image (std & HD) dan dekode + praproses dari bytes JPEG"""
+    jarang = max(1, repeat // 10)
+    pil = Image.fromarray(cv2.cvtColor(konteks.nampan, cv2.COLOR_BGR2RGB))
+    return _cetak({
+        "process_image_std": ukur(lambda: pipeline.process_image(pil, False), repeat),
+        "process_image_hd": ukur(lambda: pipeline.process_image(pil, True), jarang),
+        "muat_citra_praproses": ukur(lambda: pipeline.praproses(pipeline.muat_citra(konteks.jpeg)), repeat),
+        "muat_citra_12mp_tereduksi": ukur(lambda: pipeline.muat_citra(konteks.jpeg_12mp), jarang),
+        "muat_citra_12mp_asli": ukur(lambda: pipeline.muat_citra(konteks.jpeg_12mp, None), jarang),
+    })
+
+
+def bench_inferensi(konteks, repeat):
+    """Inferensi satu citra, batch 8 citra, dan mode tile (tanpa cache)"""
+    model, img = konteks.model, konteks.siap
+    batch = [img] * 8
+    jarang = max(1, repeat // 10)
+    return _cetak({
+        "deteksi_mentah": ukur(lambda: pipeline.deteksi_mentah(model, img), repeat),
+        "prediksi_batch_8": ukur(lambda: pipeline.prediksi_mentah(model, batch), jarang),
+        "deteksi_tile": ukur(lambda: pipeline.deteksi_tile(model, img), jarang),
+        "saring_deteksi": ukur(lambda: pipeline.saring_deteksi(konteks.mentah, 0.15, 0.45), repeat),
+    })
+
+
+def bench_gizi(konteks, repeat, seed=0):
+    """hitung_gizi dan analisis_deteksi (smart filter + gizi) pada jumlah item berbeda"""
+    rng = np.random.default_rng(seed)
+    names = konteks.model.names
+    tabel = tabel_gizi(names)
+    hasil = {}
+    for n in (5, 20, 50):
+        xyxy, confs, _ = buat_kotak_acak(n, rng)
+        cls_ids = rng.integers(0, len(names), size=n)
+        hasil[f"hitung_gizi_{n}"] = ukur(lambda: hitung_gizi(cls_ids, tabel), repeat)
+        hasil[f"analisis_deteksi_{n}"] = ukur(lambda: pipeline.analisis_deteksi(xyxy, confs, cls_ids, names), repeat)
+    return _cetak(hasil)
+
+
+def bench_grafik(konteks, repeat):
+    """Render tiga grafik satu scan, tanpa cache dan dari cache"""
+    import grafik
+
+    def tanpa_cache():
+        grafik._cache.clear()
+        grafik.grafik_scan(konteks.analisis)
+
+    tanpa_cache()  # pemanasan: matplotlib baru diimpor saat render pertama
+    return _cetak({
+        "grafik_scan": ukur(tanpa_cache, max(1, repeat // 10)),
+        "grafik_scan_cache": ukur(lambda: grafik.grafik_scan(konteks.analisis), repeat),
+    })
+
+
+def bench_pdf(konteks, repeat, jumlah_scan=20):
+    """PDF per scan (grafik sudah dirender) dan PDF harian dari jumlah_scan scan"""
+    import grafik
+    import laporan
+
+    jarang = max(1, repeat // 10)
+    grafik_scan = grafik.grafik_scan(konteks.analisis)
+    laporan.buat_pdf_scan(konteks.siap, konteks.analisis, grafik_scan)  # pemanasan impor fpdf
+    with db_sementara():
+        database.simpan_banyak_scan([konteks.argumen_simpan] * jumlah_scan)
+        database.flush()
+        return _cetak({
+            "pdf_scan": ukur(lambda: laporan.buat_pdf_scan(konteks.siap, konteks.analisis, grafik_scan), jarang),
+            f"pdf_harian_{jumlah_scan}": ukur(laporan.buat_pdf_harian, jarang),
+        })
+
+
+def bench_database(konteks, repeat):
+    """simpan_scan (antre & sampai tertulis) dan ambil_riwayat_hari_ini saat tabel membesar"""
+    hasil = {}
+    baris = konteks.argumen_simpan
+    with db_sementara():
+        terisi = 0
+        for n in (100, 1000, 10000):
+            database.simpan_banyak_scan([baris] * (n - terisi))
+            database.flush()
+
+            def simpan_tertulis():
+                database.simpan_scan(*baris)
+                database.flush()
+
+            hasil[f"simpan_scan_antre_{n}"] = ukur(lambda: database.simpan_scan(*baris), repeat)
+            hasil[f"simpan_scan_tertulis_{n}"] = ukur(simpan_tertulis, repeat)
+            hasil[f"ambil_riwayat_hari_ini_{n}"] = ukur(database.ambil_riwayat_hari_ini, max(1, repeat // 5))
+            terisi = n + 2 * repeat
+    return _cetak(hasil)
+
+
+def bench_impor(konteks, repeat):
+    """Impor dingin modul yang dimuat app.py di proses Python baru (tanpa streamlit)"""
+    perintah = [sys.executable, "-c", "import database, pipeline, stream, layanan, metrik, grafik, laporan"]
+    folder = os.path.dirname(os.path.abspath(__file__))
+    return _cetak({"modul_app": ukur(lambda: subprocess.run(perintah, cwd=folder, check=True), max(1, repeat // 10))})
+
+
+BENCHMARKS = {
+    "smart_filter": bench_smart_filter,
+    "praproses": bench_praproses,
+    "inferensi": bench_inferensi,
+    "gizi": bench_gizi,
+    "grafik": bench_grafik,
+    "pdf": bench_pdf,
+    "database": bench_database,
+    "impor": bench_impor,
+}
+
+
+def siapkan_konteks(model, seed=0):
+    """Data bersama semua grup: nampan sintetis, citra siap deteksi, dan hasil analisisnya"""
+    rng = np.random.default_rng(seed)
+    nampan = buat_nampan_sintetis(rng)
+    jpeg = encode_jpeg(nampan)
+    siap = pipeline.praproses(pipeline.muat_citra(jpeg))
+    mentah = pipeline.deteksi_mentah(model, siap)
+    analisis = pipeline.analisis_deteksi(*pipeline.saring_deteksi(mentah, 0.15, 0.45), model.names)
+    return SimpleNamespace(
+        model=model, nampan=nampan, jpeg=jpeg, siap=siap, mentah=mentah, analisis=analisis,
+        jpeg_12mp=encode_jpeg(buat_nampan_sintetis(rng, 3000, 4000)),
+        argumen_simpan=pipeline.argumen_simpan(analisis),
+    )
+
+
+# BASELINE
+def bandingkan(hasil, baseline, toleransi=TOLERANSI):
+    """Mencetak perbandingan dengan baseline, mengembalikan daftar tahap yang regresi"""
+    regresi = []
+    print(f"{'tahap':>40} {'baseline':>10} {'sekarang':>10} {'rasio':>7}")
+    for nama, ms in hasil.items():
+        acuan = baseline.get(nama)
+        if acuan is None:
+            print(f"{nama:>40} {'-':>10} {ms:>10.3f} {'baru':>7}")
+            continue
+        rasio = ms / acuan if acuan > 0 else float("inf")
+        status = ""
+        if rasio > 1 + toleransi and ms - acuan > SELISIH_MIN_MS:
+            status = "  REGRESI"
+            regresi.append(nama)
+        elif rasio < 1 - toleransi:
+            status = "  lebih cepat"
+        print(f"{nama:>40} {acuan:>10.3f} {ms:>10.3f} {rasio:>6.2f}x{status}")
+    return regresi
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark komponen pipeline deteksi MBG.")
+    parser.add_argument("names", nargs="*", help=f"Benchmark yang dijalankan: {', '.join(BENCHMARKS)} (default: semua)")
+    parser.add_argument("--repeat", type=int, default=50, help="Jumlah pengulangan per ukuran (default: 50)")
+    parser.add_argument("--model", default="best.pt", help="Path bobot YOLOv8 (default: best.pt)")
+    parser.add_argument("--model-pengganti", action="store_true", help="Selalu pakai model pengganti (tanpa best.pt)")
+    parser.add_argument("--json", default=None, help="Simpan hasil (ms per tahap) ke file JSON")
+    parser.add_argument("--baseline", default=None, help=f"File baseline pembanding (default: {BASELINE} bila ada)")
+    parser.add_argument("--simpan-baseline", action="store_true", help="Tulis hasil sebagai baseline baru")
+    parser.add_argument("--toleransi", type=float, default=TOLERANSI,
+                        help=f"Batas perlambatan relatif sebelum ditandai regresi (default: {TOLERANSI})")
+    args = parser.parse_args(argv)
+    for name in args.names:
+        if name not in BENCHMARKS:
+            parser.error(f"Benchmark tidak dikenal: {name}")
+
+    model, nama_model = muat_model_benchmark(args.model, args.model_pengganti)
+    konteks = siapkan_konteks(model)
+    hasil = {}
+    for name in args.names or BENCHMARKS:
+        print(f"== {name} ==")
+        for tahap, ms in BENCHMARKS[name](konteks, args.repeat).items():
+            hasil[f"{name}/{tahap}"] = ms
+
+    keluaran = {
+        "meta": {
+            "waktu": datetime.now().isoformat(timespec="seconds"), "model": nama_model, "repeat": args.repeat,
+            "python": platform.python_version(), "numpy": np.__version__, "opencv": cv2.__version__,
+            "platform": platform.platform(), "cpu": os.cpu_count(),
+        },
+        "hasil": hasil,
+    }
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(keluaran, f, indent=2)
+        print(f"Hasil disimpan ke {args.json}")
+    if args.simpan_baseline:
+        path = args.baseline or BASELINE
+        with open(path, "w") as f:
+            json.dump(keluaran, f, indent=2)
+        print(f"Baseline disimpan ke {path}")
+        return
+
+    path_baseline = args.baseline or (BASELINE if os.path.exists(BASELINE) else None)
+    if not path_baseline:
+        return
+    with open(path_baseline) as f:
+        baseline = json.load(f)
+    print(f"== dibandingkan dengan {path_baseline} (toleransi {args.toleransi:.0%}) ==")
+    if baseline["meta"].get("model") != nama_model:
+        print(f"Peringatan: baseline diukur dengan model {baseline['meta'].get('model')}, sekarang {nama_model}")
+    regresi = bandingkan(hasil, baseline["hasil"], args.toleransi)
+    if regresi:
+        print(f"{len(regresi)} tahap regresi: {', '.join(regresi)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""Cache sederhana yang dipakai bersama oleh app.py dan pipeline.py"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+def hash_array(arr):
+    """Hash isi array numpy (beserta bentuk & tipe datanya) sebagai kunci cache"""
+    arr = np.ascontiguousarray(arr)
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{arr.shape}|{arr.dtype}".encode())
+    h.update(memoryview(arr).cast("B"))
+    return h.hexdigest()
+
+
+class LRUCache:
+    """Cache LRU thread-safe dengan batas jumlah entri.
+
+    Objek ini di-share antar sesi Streamlit (lewat st.cache_resource),
+    jadi semua akses dilindungi lock.
+    """
+
+    def __init__(self, maxsize=32):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+def hash_bytes(data):
+    """Hash isi file (mis. hasil upload) sebagai kunci cache"""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _ukuran(value):
+    return value.nbytes if isinstance(value, np.ndarray) else len(value)
+
+
+class ByteBudgetCache:
+    """Cache LRU untuk array numpy / bytes dengan batas memori dalam byte.
+
+    Entri yang tergusur dari memori dipindah ke folder spill_dir (jika diisi),
+    yang juga dibatasi max_disk_bytes, lalu dimuat kembali saat diminta. File
+    spill dari proses sebelumnya diindeks saat cache dibuat (tertua lebih dulu
+    dihapus), sehingga ikut terhitung dalam batas disk dan tetap bisa dipakai.
+    Array disimpan read-only agar isi cache tidak bisa termodifikasi pemakainya.
+    """
+
+    def __init__(self, max_bytes=512 * 1024**2, spill_dir=None, max_disk_bytes=2 * 1024**3):
+        self.max_bytes = max_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.spill_dir = spill_dir
+        self.nbytes = 0
+        self.disk_nbytes = 0
+        self._mem = OrderedDict()
+        self._disk = OrderedDict()  # nama file (hash kunci) -> (path, jenis, ukuran)
+        self._lock = threading.Lock()
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+            self._indeks_disk()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._mem:
+                self._mem.move_to_end(key)
+                return self._mem[key]
+            nama = self._nama(key)
+            if nama in self._disk:
+                try:
+                    value = self._baca_disk(nama)
+                except (OSError, ValueError):
+                    # File dihapus / rusak (mis. oleh proses lain yang memakai folder yang sama)
+                    self._hapus_disk(nama)
+                    return default
+                self._disk.move_to_end(nama)
+                self._simpan_memori(key, value)
+                return value
+            return default
+
+    def put(self, key, value):
+        if isinstance(value, np.ndarray):
+            value.flags.writeable = False
+        with self._lock:
+            self._simpan_memori(key, value)
+
+    def get_or_compute(self, key, fn):
+        """Ambil dari cache, atau hitung dengan fn() lalu simpan"""
+        value = self.get(key)
+        if value is None:
+            value = fn()
+            self.put(key, value)
+        return value
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._mem or (self.spill_dir is not None and self._nama(key) in self._disk)
+
+    def clear(self):
+        with self._lock:
+            for nama in list(self._disk):
+                self._hapus_disk(nama)
+            self._mem.clear()
+            self.nbytes = 0
+
+    # --- internal (dipanggil dengan lock terpegang) ---
+    def _simpan_memori(self, key, value):
+        if key in self._mem:
+            self.nbytes -= _ukuran(self._mem.pop(key))
+        size = _ukuran(value)
+        if size > self.max_bytes:
+            # Terlalu besar untuk memori, langsung ke disk (jika ada)
+            self._spill(key, value)
+            return
+        self._mem[key] = value
+        self.nbytes += size
+        while self.nbytes > self.max_bytes:
+            old_key, old_value = self._mem.popitem(last=False)
+            self.nbytes -= _ukuran(old_value)
+            self._spill(old_key, old_value)
+
+    @staticmethod
+    def _nama(key):
+        return hash_bytes(key.encode())
+
+    def _indeks_disk(self):
+        """Mendaftarkan file spill yang sudah ada (urut waktu modifikasi), lalu menegakkan batas disk"""
+        daftar = []
+        for entry in os.scandir(self.spill_dir):
+            nama, _, jenis = entry.name.rpartition(".")
+            if not entry.is_file():
+                continue
+            if jenis == "tmp":  # sisa penulisan yang terputus
+                self._hapus_file(entry.path)
+            elif jenis in ("npy", "bin"):
+                stat = entry.stat()
+                daftar.append((stat.st_mtime_ns, nama, entry.path, jenis, stat.st_size))
+        for _, nama, path, jenis, size in sorted(daftar):
+            self._disk[nama] = (path, jenis, size)
+            self.disk_nbytes += size
+        self._tegakkan_batas_disk()
+
+    def _spill(self, key, value):
+        nama = self._nama(key) if self.spill_dir else None
+        if not self.spill_dir or nama in self._disk:
+            return
+        size = _ukuran(value)
+        if size > self.max_disk_bytes:
+            return
+        jenis = "npy" if isinstance(value, np.ndarray) else "bin"
+        path = os.path.join(self.spill_dir, f"{nama}.{jenis}")
+        # Ditulis ke file sementara lalu di-rename agar tidak pernah terbaca setengah jadi
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                if jenis == "npy":
+                    np.save(f, value, allow_pickle=False)
+                else:
+                    f.write(value)
+            os.replace(tmp, path)
+        except OSError:
+            self._hapus_file(tmp)
+            return
+        # Ukuran file .npy sedikit lebih besar dari nbytes (header); dihitung sama seperti saat diindeks
+        size = os.path.getsize(path)
+        self._disk[nama] = (path, jenis, size)
+        self.disk_nbytes += size
+        self._tegakkan_batas_disk()
+
+    def _tegakkan_batas_disk(self):
+        while self.disk_nbytes > self.max_disk_bytes:
+            self._hapus_disk(next(iter(self._disk)))
+
+    def _baca_disk(self, nama):
+        path, jenis, _ = self._disk[nama]
+        if jenis == "npy":
+            value = np.load(path, allow_pickle=False)
+            value.flags.writeable = False
+            return value
+        with open(path, "rb") as f:
+            return f.read()
+
+    def _hapus_disk(self, nama):
+        path, _, size = self._disk.pop(nama)
+        self.disk_nbytes -= size
+        self._hapus_file(path)
+
+    @staticmethod
+    def _hapus_file(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -1,46 +1,472 @@
+import atexit
+import contextlib
+import queue
 import sqlite3
+import sys
+import threading
+import time
 import pandas as pd
-from datetime import datetime
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+
+import metrik
+from gizi import KALORI_PER_MENU, KATEGORI, KATEGORI_PER_MENU, KODE_FOUND_TYPE
 
 DB_NAME = "riwayat_mbg.db"
+FORMAT_WAKTU = "%Y-%m-%d %H:%M:%S"
 
-def init_db():
-    """Membuat tabel jika belum ada"""
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS riwayat (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            waktu TEXT,
-            total_kalori INTEGER,
-            jumlah_item INTEGER,
-            status_gizi TEXT,
-            detail_menu TEXT
-        )
-    ''')
-    conn.commit()
-    conn.close()
-
-def simpan_scan(total_kalori, jumlah_item, status_gizi, item_list):
-    """Menyimpan hasil scan baru"""
-    conn = sqlite3.connect(DB_NAME)
+# Koneksi dipakai ulang (pool kecil) dan semua INSERT lewat satu thread penulis
+# di latar belakang yang menggabungkan beberapa scan ke dalam satu transaksi.
+UKURAN_POOL = 4
+BATCH_TULIS_MAKS = 64
+JEDA_TULIS_MAKS = 0.05  # detik menunggu scan lain sebelum transaksi ditulis
+PERCOBAAN_TULIS = 3
+_SINYAL_FLUSH = object()  # flush(): batch yang sedang dikumpulkan langsung ditulis
+
+_pool = None
+_penulis = None
+_lock_init = threading.Lock()
+
+
+def _connect():
+    conn = sqlite3.connect(DB_NAME, check_same_thread=False, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+@contextlib.contextmanager
+def _koneksi():
+    """Meminjam koneksi dari pool (membuat baru jika pool kosong)"""
+    init_db()
+    try:
+        conn = _pool.get_nowait()
+    except queue.Empty:
+        conn = _connect()
+    try:
+        yield conn
+    finally:
+        try:
+            _pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+
+def _tulis_batch(conn, scans):
+    """Menulis satu batch scan + detail deteksi, lalu memperbarui tabel rekap secara inkremental.
+
+    Mengembalikan id riwayat setiap scan (urutan sama dengan scans).
+    """
+    ids = []
+    rekap = {}       # tanggal -> [scan, kalori, item, kurang_lengkap, tanpa_sayur, tanpa_protein, tanpa_buah]
+    rekap_menu = {}  # (tanggal, menu) -> [jumlah, kalori, di_scan_kurang_lengkap]
     c = conn.cursor()
-    waktu_sekarang = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    menu_str = ", ".join([x[0] for x in item_list])
-    c.execute('''
-        INSERT INTO riwayat (waktu, total_kalori, jumlah_item, status_gizi, detail_menu)
+    for row, deteksi, found_types, waktu_tahap in scans:
+        waktu, total_kalori, jumlah_item, status_gizi, detail_menu = row
+        c.execute('''
+            INSERT INTO riwayat (waktu, total_kalori, jumlah_item, status_gizi, detail_menu)
+            VALUES (?, ?, ?, ?, ?)
+        ''', row)
+        riwayat_id = c.lastrowid
+        ids.append(riwayat_id)
+        kurang = int(status_gizi != "Seimbang")
+
+        tanggal = waktu[:10]
+        r = rekap.setdefault(tanggal, [0] * 7)
+        r[0] += 1; r[1] += total_kalori; r[2] += jumlah_item; r[3] += kurang
+        if found_types is None:
+            found_types = _found_types_menu(detail_menu.split(", "))
+        r[4] += "Sayur" not in found_types
+        r[5] += "Protein" not in found_types
+        r[6] += "Buah" not in found_types
+
+        if deteksi:
+            c.executemany('''
+                INSERT INTO deteksi (riwayat_id, cls_id, menu, conf, x1, y1, x2, y2, kalori)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', [(riwayat_id, *d) for d in deteksi])
+            for d in deteksi:
+                m = rekap_menu.setdefault((tanggal, d[1]), [0, 0, 0])
+                m[0] += 1; m[1] += d[7]; m[2] += kurang
+
+        if waktu_tahap:
+            c.executemany("INSERT INTO waktu_tahap (riwayat_id, tahap, ms) VALUES (?, ?, ?)",
+                          [(riwayat_id, tahap, ms) for tahap, ms in waktu_tahap.items()])
+
+    _tambah_rekap(c, rekap, rekap_menu)
+    return ids
+
+
+def _tambah_rekap(c, rekap, rekap_menu):
+    """UPSERT penambahan ke rekap_harian & rekap_menu_harian (format dict seperti di _tulis_batch)"""
+    c.executemany('''
+        INSERT INTO rekap_harian (tanggal, jumlah_scan, total_kalori, jumlah_item, kurang_lengkap, tanpa_sayur, tanpa_protein, tanpa_buah)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (tanggal) DO UPDATE SET
+            jumlah_scan = jumlah_scan + excluded.jumlah_scan,
+            total_kalori = total_kalori + excluded.total_kalori,
+            jumlah_item = jumlah_item + excluded.jumlah_item,
+            kurang_lengkap = kurang_lengkap + excluded.kurang_lengkap,
+            tanpa_sayur = tanpa_sayur + excluded.tanpa_sayur,
+            tanpa_protein = tanpa_protein + excluded.tanpa_protein,
+            tanpa_buah = tanpa_buah + excluded.tanpa_buah
+    ''', [(tanggal, *r) for tanggal, r in rekap.items()])
+    c.executemany('''
+        INSERT INTO rekap_menu_harian (tanggal, menu, jumlah, total_kalori, di_scan_kurang_lengkap)
         VALUES (?, ?, ?, ?, ?)
-    ''', (waktu_sekarang, total_kalori, jumlah_item, status_gizi, menu_str))
-    
-    conn.commit()
-    conn.close()
+        ON CONFLICT (tanggal, menu) DO UPDATE SET
+            jumlah = jumlah + excluded.jumlah,
+            total_kalori = total_kalori + excluded.total_kalori,
+            di_scan_kurang_lengkap = di_scan_kurang_lengkap + excluded.di_scan_kurang_lengkap
+    ''', [(tanggal, menu, *m) for (tanggal, menu), m in rekap_menu.items()])
+
+
+def _found_types_menu(menus):
+    """found_types (kode "Karbo", "Protein", "Sayur", "Buah") dari label tampilan item"""
+    lainnya = len(KATEGORI) - 1
+    return {KODE_FOUND_TYPE[k] for k in (KATEGORI_PER_MENU.get(m, lainnya) for m in menus) if k != lainnya}
+
+
+def _rekap_dari_riwayat(c):
+    """Rekonstruksi rekap untuk database lama (sebelum ada tabel rekap & deteksi).
+
+    detail_menu berisi label tampilan item dipisah koma; kalori dan kategori tiap
+    label dicari di gizi (label yang tidak dikenal: 0 kkal, kategori Lainnya).
+    """
+    rekap, rekap_menu = {}, {}
+    rows = c.execute("SELECT waktu, total_kalori, jumlah_item, status_gizi, detail_menu FROM riwayat").fetchall()
+    for waktu, total_kalori, jumlah_item, status_gizi, detail_menu in rows:
+        tanggal = waktu[:10]
+        kurang = int(status_gizi != "Seimbang")
+        menus = [m for m in (detail_menu or "").split(", ") if m]
+        found_types = _found_types_menu(menus)
+
+        r = rekap.setdefault(tanggal, [0] * 7)
+        r[0] += 1; r[1] += total_kalori or 0; r[2] += jumlah_item or 0; r[3] += kurang
+        r[4] += "Sayur" not in found_types
+        r[5] += "Protein" not in found_types
+        r[6] += "Buah" not in found_types
+        for menu in menus:
+            m = rekap_menu.setdefault((tanggal, menu), [0, 0, 0])
+            m[0] += 1; m[1] += KALORI_PER_MENU.get(menu, 0); m[2] += kurang
+    _tambah_rekap(c, rekap, rekap_menu)
+
+
+class GagalSimpan(RuntimeError):
+    """Scan gagal ditulis ke database (lewat Future dari simpan_scan, ambil_galat, atau flush)"""
+
+
+class _PenulisLatar(threading.Thread):
+    """Thread yang menulis antrian scan ke tabel riwayat secara batch"""
+
+    def __init__(self):
+        super().__init__(name="mbg-db-writer", daemon=True)
+        self.antrian = queue.Queue()
+        self.galat = None  # GagalSimpan terakhir, diambil oleh ambil_galat()
+
+    def run(self):
+        conn = _connect()
+        berhenti = False
+        while not berhenti:
+            batch = [self.antrian.get()]
+            batas = time.monotonic() + JEDA_TULIS_MAKS
+            while len(batch) < BATCH_TULIS_MAKS and batch[-1] is not None and batch[-1] is not _SINYAL_FLUSH:
+                try:
+                    batch.append(self.antrian.get(timeout=max(batas - time.monotonic(), 0)))
+                except queue.Empty:
+                    break
+            if batch[-1] is None:  # sinyal berhenti dari tutup()
+                berhenti = True
+            items = [item for item in batch if item is not None and item is not _SINYAL_FLUSH]
+            try:
+                if items:
+                    conn = self._tulis(conn, items)
+            except Exception as e:
+                # Thread penulis tidak boleh mati: flush() akan menunggu selamanya
+                self._gagal([hasil for _, hasil in items if not hasil.done()], e)
+            finally:
+                for _ in batch:
+                    self.antrian.task_done()
+        conn.close()
+
+    def _tulis(self, conn, items):
+        """Menulis satu batch (scan, Future) dengan beberapa percobaan (mis. database terkunci sementara).
+
+        Jika tetap gagal, scan ditulis satu per satu agar satu scan bermasalah tidak
+        ikut menggugurkan scan lain di batch yang sama. Future setiap scan diisi id
+        riwayatnya atau GagalSimpan. Mengembalikan koneksi yang dipakai.
+        """
+        scans = [scan for scan, _ in items]
+        for percobaan in range(PERCOBAAN_TULIS):
+            try:
+                with conn, metrik.ukur("tulis_db"):
+                    ids = _tulis_batch(conn, scans)
+            except Exception as e:
+                galat = e
+                if isinstance(e, sqlite3.ProgrammingError):  # koneksi rusak / tertutup
+                    conn = _connect()
+                if percobaan + 1 < PERCOBAAN_TULIS:
+                    time.sleep(0.05 * 2 ** percobaan)
+                continue
+            for (_, hasil), riwayat_id in zip(items, ids):
+                hasil.set_result(riwayat_id)
+            return conn
+        if len(items) == 1:
+            self._gagal([items[0][1]], galat)
+            return conn
+        gagal = []
+        for scan, hasil in items:
+            try:
+                with conn:
+                    riwayat_id, = _tulis_batch(conn, [scan])
+            except Exception as e:
+                gagal.append(hasil)
+                galat = e
+                continue
+            hasil.set_result(riwayat_id)
+        self._gagal(gagal, galat)
+        return conn
+
+    def _gagal(self, daftar_hasil, e):
+        if not daftar_hasil:
+            return
+        print(f"[database] Gagal menyimpan {len(daftar_hasil)} scan: {e}", file=sys.stderr)
+        for hasil in daftar_hasil:
+            hasil.set_exception(GagalSimpan(f"Scan gagal disimpan ke database: {e}"))
+        self.galat = GagalSimpan(f"{len(daftar_hasil)} scan gagal disimpan ke database: {e}")
+
+
+def init_db():
+    """Membuat tabel & index jika belum ada (cukup sekali per proses)"""
+    global _pool, _penulis
+    if _penulis is not None:
+        return
+    with _lock_init:
+        if _penulis is not None:
+            return
+        conn = _connect()
+        c = conn.cursor()
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS riwayat (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                waktu TEXT,
+                total_kalori INTEGER,
+                jumlah_item INTEGER,
+                status_gizi TEXT,
+                detail_menu TEXT
+            )
+        ''')
+        c.execute("CREATE INDEX IF NOT EXISTS idx_riwayat_waktu ON riwayat (waktu)")
+
+        # Detail per item yang terdeteksi (satu baris per kotak)
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS deteksi (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                riwayat_id INTEGER REFERENCES riwayat (id),
+                cls_id INTEGER,
+                menu TEXT,
+                conf REAL,
+                x1 REAL, y1 REAL, x2 REAL, y2 REAL,
+                kalori INTEGER
+            )
+        ''')
+        c.execute("CREATE INDEX IF NOT EXISTS idx_deteksi_riwayat ON deteksi (riwayat_id)")
+
+        # Waktu per tahap pipeline (ms) untuk setiap scan
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS waktu_tahap (
+                riwayat_id INTEGER REFERENCES riwayat (id),
+                tahap TEXT,
+                ms REAL
+            )
+        ''')
+        c.execute("CREATE INDEX IF NOT EXISTS idx_waktu_tahap_riwayat ON waktu_tahap (riwayat_id)")
+
+        # Rekap yang diperbarui setiap insert, agar tampilan minggu/bulan tidak membaca data mentah
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS rekap_harian (
+                tanggal TEXT PRIMARY KEY,
+                jumlah_scan INTEGER DEFAULT 0,
+                total_kalori INTEGER DEFAULT 0,
+                jumlah_item INTEGER DEFAULT 0,
+                kurang_lengkap INTEGER DEFAULT 0,
+                tanpa_sayur INTEGER DEFAULT 0,
+                tanpa_protein INTEGER DEFAULT 0,
+                tanpa_buah INTEGER DEFAULT 0
+            )
+        ''')
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS rekap_menu_harian (
+                tanggal TEXT,
+                menu TEXT,
+                jumlah INTEGER DEFAULT 0,
+                total_kalori INTEGER DEFAULT 0,
+                di_scan_kurang_lengkap INTEGER DEFAULT 0,
+                PRIMARY KEY (tanggal, menu)
+            )
+        ''')
+
+        # Database lama (sebelum ada rekap): isi kedua tabel rekap dari riwayat sekali saja
+        if c.execute("SELECT NOT EXISTS (SELECT 1 FROM rekap_harian) AND EXISTS (SELECT 1 FROM riwayat)").fetchone()[0]:
+            _rekap_dari_riwayat(c)
+        conn.commit()
+
+        _pool = queue.Queue(maxsize=UKURAN_POOL)
+        _pool.put_nowait(conn)
+        _penulis = _PenulisLatar()
+        _penulis.start()
+
+def flush(laporkan=True):
+    """Menulis semua scan di antrian sekarang juga (tanpa menunggu jeda batch) lalu menunggu selesai.
+
+    laporkan=True: raise GagalSimpan (dari ambil_galat) jika ada scan yang gagal ditulis.
+    Fungsi ambil_* memakai laporkan=False agar galat milik pemanggil lain tidak
+    ikut terambil; gagal per scan dilaporkan lewat Future dari simpan_scan.
+    """
+    penulis = _penulis
+    if penulis is None:
+        return
+    penulis.antrian.put(_SINYAL_FLUSH)
+    penulis.antrian.join()
+    if laporkan:
+        galat = ambil_galat()
+        if galat is not None:
+            raise galat
+
+def ambil_galat():
+    """GagalSimpan terakhir dari penulis latar belakang (lalu dikosongkan), atau None"""
+    penulis = _penulis
+    if penulis is None:
+        return None
+    galat, penulis.galat = penulis.galat, None
+    return galat
+
+def tutup():
+    """Menulis sisa antrian lalu menutup semua koneksi (mis. sebelum mengganti DB_NAME)"""
+    global _pool, _penulis
+    with _lock_init:
+        if _penulis is None:
+            return
+        _penulis.antrian.put(None)
+        _penulis.join()
+        while not _pool.empty():
+            _pool.get_nowait().close()
+        _pool = None
+        _penulis = None
+
+atexit.register(flush, laporkan=False)
+
+def _item_antrian(waktu, total_kalori, jumlah_item, status_gizi, item_list, deteksi=None, found_types=None, waktu_tahap=None):
+    """(scan, Future) untuk antrian penulis; Future berisi id riwayat atau GagalSimpan"""
+    row = (waktu, total_kalori, jumlah_item, status_gizi, ", ".join([x[0] for x in item_list]))
+    return (row, deteksi, found_types, dict(waktu_tahap) if waktu_tahap else None), Future()
+
+def simpan_scan(total_kalori, jumlah_item, status_gizi, item_list, deteksi=None, found_types=None, waktu_tahap=None):
+    """Menyimpan hasil scan baru (ditulis di latar belakang).
+
+    deteksi (opsional) berisi tuple (cls_id, menu, conf, x1, y1, x2, y2, kalori) per item,
+    found_types (opsional) berisi kategori yang ditemukan ("Sayur", "Protein", "Buah", ...),
+    waktu_tahap (opsional) berisi {tahap: ms} dari metrik.WaktuScan.
+    Mengembalikan Future: result() = id riwayat setelah ditulis, atau raise GagalSimpan.
+    """
+    init_db()
+    waktu_sekarang = datetime.now().strftime(FORMAT_WAKTU)
+    item = _item_antrian(waktu_sekarang, total_kalori, jumlah_item, status_gizi, item_list, deteksi,
+                         found_types, waktu_tahap)
+    _penulis.antrian.put(item)
+    return item[1]
+
+def simpan_banyak_scan(daftar_scan):
+    """Menyimpan banyak hasil scan sekaligus (untuk batch scan).
+
+    daftar_scan berisi tuple argumen simpan_scan:
+    (total_kalori, jumlah_item, status_gizi, item_list[, deteksi, found_types, waktu_tahap]).
+    Mengembalikan daftar Future (satu per scan, lihat simpan_scan).
+    """
+    init_db()
+    waktu_sekarang = datetime.now().strftime(FORMAT_WAKTU)
+    items = [_item_antrian(waktu_sekarang, *args) for args in daftar_scan]
+    for item in items:
+        _penulis.antrian.put(item)
+    return [hasil for _, hasil in items]
+
+def rentang_hari(tanggal=None):
+    """Batas [awal, akhir) satu hari sebagai teks, untuk predikat range pada kolom waktu"""
+    tanggal = tanggal or datetime.now()
+    awal = tanggal.replace(hour=0, minute=0, second=0, microsecond=0)
+    return awal.strftime(FORMAT_WAKTU), (awal + timedelta(days=1)).strftime(FORMAT_WAKTU)
 
 def ambil_riwayat_hari_ini():
     """Mengambil data scan HANYA hari ini"""
-    conn = sqlite3.connect(DB_NAME)
-    hari_ini = datetime.now().strftime("%Y-%m-%d")
-    query = f"SELECT waktu, detail_menu, total_kalori, status_gizi FROM riwayat WHERE waktu LIKE '{hari_ini}%' ORDER BY waktu DESC"
-    df = pd.read_sql_query(query, conn)
-    conn.close()
+    flush(laporkan=False)
+    awal, akhir = rentang_hari()
+    query = "SELECT waktu, detail_menu, total_kalori, status_gizi FROM riwayat WHERE waktu >= ? AND waktu < ? ORDER BY waktu DESC"
+    with _koneksi() as conn:
+        df = pd.read_sql_query(query, conn, params=(awal, akhir))
     df.columns = ["Jam Scan", "Menu Terdeteksi", "Kalori (kkal)", "Status"]
-    return df
\ No newline at end of file
+    return df
+
+def ambil_rekap_harian(hari=7):
+    """Rekap per hari untuk N hari terakhir (dibaca dari tabel rekap, bukan data mentah)"""
+    flush(laporkan=False)
+    awal = (datetime.now() - timedelta(days=hari - 1)).strftime("%Y-%m-%d")
+    query = '''
+        SELECT tanggal, jumlah_scan, total_kalori / jumlah_scan,
+               ROUND(100.0 * kurang_lengkap / jumlah_scan, 1),
+               tanpa_sayur, tanpa_protein, tanpa_buah
+        FROM rekap_harian WHERE tanggal >= ? ORDER BY tanggal DESC
+    '''
+    with _koneksi() as conn:
+        df = pd.read_sql_query(query, conn, params=(awal,))
+    df.columns = ["Tanggal", "Jumlah Scan", "Rata-rata Kalori (kkal)", "Kurang Lengkap (%)", "Tanpa Sayur", "Tanpa Protein", "Tanpa Buah"]
+    return df
+
+def ambil_rekap_menu(hari=7):
+    """Rekap per item menu untuk N hari terakhir (dibaca dari tabel rekap, bukan data mentah)"""
+    flush(laporkan=False)
+    awal = (datetime.now() - timedelta(days=hari - 1)).strftime("%Y-%m-%d")
+    query = '''
+        SELECT menu, SUM(jumlah) AS jumlah, SUM(total_kalori),
+               ROUND(100.0 * SUM(di_scan_kurang_lengkap) / SUM(jumlah), 1)
+        FROM rekap_menu_harian WHERE tanggal >= ? GROUP BY menu ORDER BY jumlah DESC
+    '''
+    with _koneksi() as conn:
+        df = pd.read_sql_query(query, conn, params=(awal,))
+    df.columns = ["Menu", "Jumlah", "Total Kalori (kkal)", "Di Scan Kurang Lengkap (%)"]
+    return df
+
+def ambil_scan_harian(tanggal=None):
+    """Semua scan pada satu hari beserta item terdeteksinya (untuk laporan harian)"""
+    flush(laporkan=False)
+    awal, akhir = rentang_hari(tanggal)
+    with _koneksi() as conn:
+        rows = conn.execute('''
+            SELECT id, waktu, total_kalori, jumlah_item, status_gizi, detail_menu
+            FROM riwayat WHERE waktu >= ? AND waktu < ? ORDER BY waktu
+        ''', (awal, akhir)).fetchall()
+        items = conn.execute('''
+            SELECT d.riwayat_id, d.menu, d.kalori
+            FROM deteksi d JOIN riwayat r ON r.id = d.riwayat_id
+            WHERE r.waktu >= ? AND r.waktu < ? ORDER BY d.id
+        ''', (awal, akhir)).fetchall()
+
+    scans = {}
+    for id_, waktu, total_kalori, jumlah_item, status_gizi, detail_menu in rows:
+        scans[id_] = {"waktu": waktu, "total_kalori": total_kalori, "jumlah_item": jumlah_item,
+                      "status_gizi": status_gizi, "detail_menu": detail_menu, "items": []}
+    for riwayat_id, menu, kalori in items:
+        scans[riwayat_id]["items"].append((menu, kalori))
+    return list(scans.values())
+
+def ambil_waktu_tahap(hari=7):
+    """Rata-rata & maksimum waktu per tahap pipeline (ms) untuk scan N hari terakhir"""
+    flush(laporkan=False)
+    awal = (datetime.now() - timedelta(days=hari - 1)).strftime("%Y-%m-%d")
+    query = '''
+        SELECT w.tahap, COUNT(*), ROUND(AVG(w.ms), 1), ROUND(MAX(w.ms), 1)
+        FROM waktu_tahap w JOIN riwayat r ON r.id = w.riwayat_id
+        WHERE r.waktu >= ? GROUP BY w.tahap ORDER BY AVG(w.ms) DESC
+    '''
+    with _koneksi() as conn:
+        df = pd.read_sql_query(query, conn, params=(awal,))
+    df.columns = ["Tahap", "Jumlah Scan", "Rata-rata (ms)", "Maksimum (ms)"]
+    return df
@@ -0,0 +1,161 @@
+"""Database gizi 51 kelas menu MBG beserta perhitungan total gizi per scan"""
+import functools
+
+import numpy as np
+
+# --- DATABASE GIZI LENGKAP (51 KELAS DATASET) ---
+# Format Macros: (Karbohidrat, Protein, Lemak) dalam gram
+database_gizi = {
+    # === KARBOHIDRAT (NASI & MIE) ===
+    "nasi putih":     {"label": "Nasi Putih",         "kalori": 175, "tipe": "Karbohidrat", "macros": (40, 4, 0)},
+    "nasi kuning":    {"label": "Nasi Kuning",        "kalori": 200, "tipe": "Karbohidrat", "macros": (42, 4, 4)},
+    "nasi goreng":    {"label": "Nasi Goreng",        "kalori": 250, "tipe": "Karbohidrat", "macros": (45, 6, 8)},
+    "mie":            {"label": "Mie Goreng/Rebus",   "kalori": 220, "tipe": "Karbohidrat", "macros": (35, 5, 8)},
+    "kentang goreng": {"label": "Kentang Goreng",     "kalori": 150, "tipe": "Karbohidrat", "macros": (20, 2, 7)},
+    "burger":         {"label": "Burger",             "kalori": 300, "tipe": "Karbohidrat/Protein", "macros": (30, 15, 12)},
+
+    # === PROTEIN HEWANI (AYAM) ===
+    "ayam goreng":    {"label": "Ayam Goreng",        "kalori": 200, "tipe": "Protein Hewani", "macros": (2, 22, 12)},
+    "ayam bakar":     {"label": "Ayam Bakar",         "kalori": 180, "tipe": "Protein Hewani", "macros": (4, 24, 8)},
+    "ayam kecap":     {"label": "Ayam Kecap",         "kalori": 210, "tipe": "Protein Hewani", "macros": (8, 22, 10)},
+    "ayam krispi":    {"label": "Ayam Krispi/Fried Chicken", "kalori": 280, "tipe": "Protein Hewani", "macros": (15, 20, 18)},
+    "ayam suwir":     {"label": "Ayam Suwir",         "kalori": 150, "tipe": "Protein Hewani", "macros": (2, 25, 5)},
+    "katsu":          {"label": "Chicken Katsu",      "kalori": 250, "tipe": "Protein Hewani", "macros": (15, 18, 14)},
+    "nugget":         {"label": "Nugget Ayam",        "kalori": 180, "tipe": "Protein Hewani", "macros": (12, 10, 10)},
+
+    # === PROTEIN HEWANI (DAGING, IKAN, BAKSO) ===
+    "olahan daging sapi": {"label": "Olahan Daging Sapi", "kalori": 220, "tipe": "Protein Hewani", "macros": (5, 22, 12)},
+    "bakso":          {"label": "Bakso",              "kalori": 190, "tipe": "Protein Hewani", "macros": (10, 12, 10)},
+    "lele goreng":    {"label": "Lele Goreng",        "kalori": 160, "tipe": "Protein Hewani", "macros": (3, 15, 10)},
+
+    # === PROTEIN HEWANI (TELUR) ===
+    "telur rebus":    {"label": "Telur Rebus",        "kalori": 75,  "tipe": "Protein Hewani", "macros": (0, 7, 5)},
+    "telur goreng":   {"label": "Telur Goreng/Dadar", "kalori": 110, "tipe": "Protein Hewani", "macros": (1, 7, 9)},
+    "telur kecap":    {"label": "Telur Kecap",        "kalori": 130, "tipe": "Protein Hewani", "macros": (5, 7, 9)},
+
+    # === PROTEIN NABATI (TAHU & TEMPE) ===
+    "tahu":           {"label": "Tahu",               "kalori": 70,  "tipe": "Protein Nabati", "macros": (2, 8, 4)},
+    "tahu goreng":    {"label": "Tahu Goreng",        "kalori": 85,  "tipe": "Protein Nabati", "macros": (3, 8, 6)},
+    "tahu bacem":     {"label": "Tahu Bacem",         "kalori": 100, "tipe": "Protein Nabati", "macros": (8, 8, 5)},
+    "tempe goreng":   {"label": "Tempe Goreng",       "kalori": 100, "tipe": "Protein Nabati", "macros": (7, 9, 6)},
+    "tempe bacem":    {"label": "Tempe Bacem",        "kalori": 120, "tipe": "Protein Nabati", "macros": (12, 9, 6)},
+    "tempe orek":     {"label": "Tempe Orek",         "kalori": 130, "tipe": "Protein Nabati", "macros": (15, 8, 6)},
+    "keripik tempe":  {"label": "Keripik Tempe",      "kalori": 150, "tipe": "Pelengkap", "macros": (18, 5, 8)},
+
+    # === SAYURAN (SERAT & VITAMIN) ===
+    "sayur sop":      {"label": "Sayur Sop",          "kalori": 60,  "tipe": "Serat & Vitamin", "macros": (8, 2, 2)},
+    "sayur bayam":    {"label": "Sayur Bayam",        "kalori": 40,  "tipe": "Serat & Vitamin", "macros": (4, 2, 0)},
+    "sayur tumis":    {"label": "Tumis Sayur",        "kalori": 70,  "tipe": "Serat & Vitamin", "macros": (6, 2, 4)},
+    "sayur pakcoy":   {"label": "Tumis Pakcoy",       "kalori": 50,  "tipe": "Serat & Vitamin", "macros": (5, 2, 3)},
+    "cah kangkung":   {"label": "Cah Kangkung",       "kalori": 60,  "tipe": "Serat & Vitamin", "macros": (5, 3, 4)},
+    "cah sayur":      {"label": "Cah Sayuran",        "kalori": 60,  "tipe": "Serat & Vitamin", "macros": (5, 2, 4)},
+    "selada air":     {"label": "Selada Air",         "kalori": 20,  "tipe": "Serat & Vitamin", "macros": (2, 1, 0)},
+    "kemangi":        {"label": "Daun Kemangi",       "kalori": 5,   "tipe": "Serat & Vitamin", "macros": (1, 0, 0)},
+    "timun":          {"label": "Potongan Timun",     "kalori": 10,  "tipe": "Serat & Vitamin", "macros": (2, 0, 0)},
+    "tomat":          {"label": "Potongan Tomat",     "kalori": 15,  "tipe": "Serat & Vitamin", "macros": (3, 1, 0)},
+
+    # === BUAH-BUAHAN (VITAMIN) ===
+    "buah pisang":    {"label": "Pisang",             "kalori": 90,  "tipe": "Vitamin", "macros": (23, 1, 0)},
+    "buah jeruk":     {"label": "Jeruk",              "kalori": 45,  "tipe": "Vitamin", "macros": (11, 1, 0)},
+    "buah apel":      {"label": "Apel",               "kalori": 52,  "tipe": "Vitamin", "macros": (14, 0, 0)},
+    "buah semangka":  {"label": "Semangka",           "kalori": 30,  "tipe": "Vitamin", "macros": (8, 1, 0)},
+    "buah melon":     {"label": "Melon",              "kalori": 34,  "tipe": "Vitamin", "macros": (9, 1, 0)},
+    "buah pepaya":    {"label": "Pepaya",             "kalori": 43,  "tipe": "Vitamin", "macros": (11, 0, 0)},
+    "buah salak":     {"label": "Salak",              "kalori": 70,  "tipe": "Vitamin", "macros": (17, 1, 0)},
+    "buah anggur":    {"label": "Anggur",             "kalori": 67,  "tipe": "Vitamin", "macros": (17, 0, 0)},
+    "buah kelengkeng":{"label": "Kelengkeng",         "kalori": 60,  "tipe": "Vitamin", "macros": (15, 1, 0)},
+    "buah naga":      {"label": "Buah Naga",          "kalori": 50,  "tipe": "Vitamin", "macros": (13, 1, 0)},
+    "buah strawberry":{"label": "Strawberry",         "kalori": 32,  "tipe": "Vitamin", "macros": (8, 1, 0)},
+
+    # === PELENGKAP & MINUMAN ===
+    "acar biasa":     {"label": "Acar Timun/Wortel",  "kalori": 30,  "tipe": "Pelengkap", "macros": (5, 0, 0)},
+    "acar mayo":      {"label": "Salad/Acar Mayo",    "kalori": 80,  "tipe": "Pelengkap", "macros": (4, 1, 7)},
+    "susu":           {"label": "Susu UHT/Kotak",     "kalori": 120, "tipe": "Minuman Bergizi", "macros": (10, 6, 6)},
+    
+    # === LAINNYA (NON-MAKANAN) ===
+    "tray mbg":       {"label": "Nampan MBG",         "kalori": 0,   "tipe": "Wadah", "macros": (0, 0, 0)},
+}
+
+
+# --- TABEL GIZI BERBASIS ARRAY (INDEKS = CLASS ID MODEL) ---
+# database_gizi dikompilasi sekali per model.names menjadi array NumPy, sehingga
+# total per scan cukup dihitung dengan bincount + dot product atas vektor class id.
+KATEGORI = ("Karbohidrat", "Protein", "Sayuran", "Buah-buahan", "Lainnya")
+KODE_FOUND_TYPE = ("Karbo", "Protein", "Sayur", "Buah")  # urutan sama dengan KATEGORI[:4]
+
+def kategori_kelas(label, tipe):
+    """Kode kategori (indeks KATEGORI) untuk satu kelas"""
+    if "Karbohidrat" in tipe: return 0
+    elif "Protein" in tipe: return 1
+    elif "Serat" in tipe or "Sayur" in label: return 2
+    elif "Vitamin" in tipe or "Buah" in label: return 3
+    else: return 4
+
+# Pencarian balik dari label tampilan (kolom menu di database) ke kode kategori
+KATEGORI_PER_MENU = {info["label"]: kategori_kelas(key, info["tipe"]) for key, info in database_gizi.items()}
+KALORI_PER_MENU = {info["label"]: info["kalori"] for info in database_gizi.values()}
+
+class TabelGizi:
+    """database_gizi dalam bentuk array yang sejajar dengan class id model"""
+
+    def __init__(self, class_names):
+        if not isinstance(class_names, dict):
+            class_names = dict(enumerate(class_names))
+        n = max(class_names) + 1 if class_names else 0
+
+        self.kalori = np.zeros(n, dtype=np.int64)
+        self.macros = np.zeros((n, 3), dtype=np.int64)  # (Karbohidrat, Protein, Lemak)
+        self.kategori = np.full(n, 4, dtype=np.intp)
+        self.item_detail = [("", "Lainnya", "0 kkal")] * n
+
+        for cls_id, label in class_names.items():
+            default_info = {"label": label, "tipe": "Lainnya", "kalori": 0, "macros": (0,0,0)}
+            info = database_gizi.get(label, default_info)
+            self.kalori[cls_id] = info['kalori']
+            self.macros[cls_id] = info.get('macros', (0,0,0))
+            self.kategori[cls_id] = kategori_kelas(label, info['tipe'])
+            self.item_detail[cls_id] = (info['label'], info['tipe'], f"{info['kalori']} kkal")
+
+    def __len__(self):
+        return len(self.kalori)
+
+@functools.lru_cache(maxsize=8)
+def _kompilasi(items):
+    return TabelGizi(dict(items))
+
+def tabel_gizi(class_names):
+    """TabelGizi untuk model.names tertentu (dikompilasi sekali lalu di-cache)"""
+    items = class_names.items() if isinstance(class_names, dict) else enumerate(class_names)
+    return _kompilasi(tuple(items))
+
+def buat_rekomendasi(total_kalori, found_types):
+    """Logika Rekomendasi (Standar MBG)"""
+    rekomendasi = []
+    if total_kalori < 400: rekomendasi.append("- Total Kalori di bawah standar makan siang MBG (Min. 400 kkal).")
+    if "Sayur" not in found_types: rekomendasi.append("- Komponen Sayuran tidak ditemukan. Menu tidak seimbang.")
+    if "Protein" not in found_types: rekomendasi.append("- Komponen Lauk/Protein tidak ditemukan.")
+    if "Buah" not in found_types: rekomendasi.append("- Komponen Buah tidak ditemukan.")
+    return rekomendasi
+
+def hitung_gizi(cls_ids, tabel):
+    """Menghitung total kalori, makronutrisi, komposisi, dan rekomendasi dari vektor class id"""
+    cls_ids = np.asarray(cls_ids, dtype=np.intp)
+    counts = np.bincount(cls_ids, minlength=len(tabel))
+    total_kalori = int(counts @ tabel.kalori)
+    total_karbo, total_protein, total_lemak = (int(x) for x in counts @ tabel.macros)
+    per_kategori = np.bincount(tabel.kategori[cls_ids], minlength=len(KATEGORI))
+
+    komposisi_tipe = dict(zip(KATEGORI, per_kategori.tolist()))
+    found_types = {kode for kode, n in zip(KODE_FOUND_TYPE, per_kategori) if n > 0}
+    rekomendasi = buat_rekomendasi(total_kalori, found_types)
+
+    return {
+        "total_kalori": total_kalori,
+        "macros": (total_karbo, total_protein, total_lemak),
+        "komposisi_tipe": komposisi_tipe,
+        "found_types": found_types,
+        "item_details": [tabel.item_detail[c] for c in cls_ids],
+        "kalori_items": tabel.kalori[cls_ids].tolist(),
+        "rekomendasi": rekomendasi,
+        "status_db": "Seimbang" if not rekomendasi else "Kurang Lengkap",
+    }
@@ -0,0 +1,74 @@
+"""Grafik statistik gizi (proporsi, kalori, makro) sebagai bytes PNG.
+
+Grafik digambar dengan Figure + canvas Agg (tanpa pyplot), sehingga tidak ada
+registry figure global yang terus membesar dan aman dipanggil dari thread mana
+pun. Hasil PNG di-cache berdasarkan data masukan; bytes yang sama dipakai untuk
+tampilan Streamlit dan laporan PDF. matplotlib baru diimpor saat grafik pertama
+dirender, bukan saat aplikasi dimulai.
+"""
+import io
+
+from cache import ByteBudgetCache
+
+WARNA_MAKRO = ['#F4D03F', '#E74C3C', '#5DADE2']
+DPI = 150
+
+_cache = ByteBudgetCache(max_bytes=32 * 1024**2)
+
+
+def _render(gambar, figsize):
+    """Menggambar satu figure lalu langsung melepasnya, mengembalikan bytes PNG"""
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=figsize, dpi=DPI)
+    FigureCanvasAgg(fig)
+    ax = fig.subplots()
+    gambar(ax)
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", bbox_inches="tight")
+    fig.clear()
+    return buf.getvalue()
+
+def _cached(key, gambar, figsize):
+    return _cache.get_or_compute(key, lambda: _render(gambar, figsize))
+
+
+def grafik_proporsi(komposisi):
+    """Pie chart proporsi (dict kategori -> jumlah; kategori bernilai 0 diabaikan)"""
+    d_pie = tuple((k, v) for k, v in komposisi.items() if v > 0)
+
+    def gambar(ax):
+        if d_pie: ax.pie([v for _, v in d_pie], labels=[k for k, _ in d_pie], autopct='%1.1f%%', startangle=90)
+    return _cached(f"proporsi|{d_pie!r}", gambar, (4, 3))
+
+def _barh(jenis, names, values):
+    names, values = tuple(names), tuple(int(v) for v in values)
+
+    def gambar(ax):
+        ax.barh(names, values, color='skyblue')
+    return _cached(f"{jenis}|{names!r}|{values!r}", gambar, (5, 3))
+
+def grafik_kalori(names, cals):
+    """Bar chart horizontal kalori per item"""
+    return _barh("kalori", names, cals)
+
+def grafik_menu(names, counts):
+    """Bar chart horizontal jumlah kemunculan per menu (laporan harian)"""
+    return _barh("menu", names, counts)
+
+def grafik_makro(macros):
+    """Bar chart makronutrisi (Karbohidrat, Protein, Lemak) dalam gram"""
+    macros = tuple(int(m) for m in macros)
+
+    def gambar(ax):
+        ax.bar(['Karbo', 'Protein', 'Lemak'], macros, color=WARNA_MAKRO)
+    return _cached(f"makro|{macros!r}", gambar, (4, 3))
+
+def grafik_scan(analisis):
+    """Ketiga grafik untuk satu hasil analisis, dirender sekali per scan"""
+    return {
+        "proporsi": grafik_proporsi(analisis["komposisi_tipe"]),
+        "kalori": grafik_kalori([x[0] for x in analisis["item_details"]], analisis["kalori_items"]),
+        "makro": grafik_makro(analisis["macros"]),
+    }
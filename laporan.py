@@ -0,0 +1,215 @@
+"""Pembuatan laporan PDF (per scan & rekap harian) sepenuhnya di memori.
+
+Laporan dibangun oleh thread pekerja di latar belakang dan hanya saat diminta.
+Bisa juga dijalankan langsung untuk mencetak laporan harian dari database:
+
+    python laporan.py --tanggal 2026-01-30 -o Laporan_Harian_MBG.pdf
+
+fpdf (dan matplotlib lewat grafik.py) baru diimpor saat laporan pertama dibuat.
+"""
+import argparse
+import functools
+import io
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import cv2
+from PIL import Image
+
+import database
+import metrik
+from gizi import KATEGORI, KATEGORI_PER_MENU
+from grafik import grafik_menu, grafik_proporsi, grafik_scan
+
+# Beberapa pekerja agar laporan harian yang panjang dari satu sesi tidak menahan
+# PDF sesi lain; tetap dibatasi supaya tidak berebut CPU dengan inferensi
+PEKERJA_LAPORAN = 4
+_executor = ThreadPoolExecutor(max_workers=PEKERJA_LAPORAN, thread_name_prefix="mbg-laporan")
+
+
+# KELAS PDF GENERATOR
+@functools.lru_cache(maxsize=None)
+def _kelas_pdf():
+    """Kelas PDF dibuat saat laporan pertama diminta (impor fpdf ditunda)"""
+    from fpdf import FPDF
+
+    class PDF(FPDF):
+        def header(self):
+            self.set_font('Arial', 'B', 16)
+            self.cell(0, 10, 'LAPORAN DETEKSI KOMPOSISI MENU MBG', 0, 1, 'C')
+            self.set_font('Arial', 'I', 10)
+            self.cell(0, 5, 'Implementasi Deep Learning YOLOv8 pada Program Makan Bergizi Gratis', 0, 1, 'C')
+            self.ln(10)
+        def footer(self):
+            self.set_y(-15)
+            self.set_font('Arial', 'I', 8)
+            self.cell(0, 10, f'Halaman {self.page_no()} - Sistem Deteksi Komposisi Menu', 0, 0, 'C')
+
+        def image_bytes(self, name, data, x=None, y=None, w=0, h=0):
+            """Seperti FPDF.image, tetapi dari bytes JPEG/PNG di memori (tanpa file sementara).
+
+            Citra dengan name yang sama hanya disematkan sekali walau dipakai di banyak halaman.
+            """
+            if name not in self.images:
+                with Image.open(io.BytesIO(data)) as im:
+                    info = {'w': im.width, 'h': im.height, 'cs': 'DeviceRGB', 'bpc': 8}
+                    if im.format == "JPEG" and im.mode == "RGB":
+                        info.update(f='DCTDecode', data=data)
+                    else:
+                        info.update(f='FlateDecode', data=zlib.compress(im.convert("RGB").tobytes()))
+                info['i'] = len(self.images) + 1
+                self.images[name] = info
+            self.image(name, x=x, y=y, w=w, h=h)
+
+    return PDF
+
+def __getattr__(name):
+    # laporan.PDF tetap tersedia untuk kode lama, dibuat saat pertama diakses
+    if name == "PDF":
+        return _kelas_pdf()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def encode_jpeg(img_bgr, quality=90):
+    return cv2.imencode(".jpg", img_bgr, [cv2.IMWRITE_JPEG_QUALITY, quality])[1].tobytes()
+
+
+# LAPORAN PER SCAN
+def buat_pdf_scan(img_res, analisis, grafik=None, tanggal=None):
+    """PDF hasil satu scan (img_res: citra BGR beranotasi, analisis: hasil pipeline.analisis_deteksi).
+
+    grafik: hasil grafik.grafik_scan yang sudah dirender untuk UI (dirender ulang jika kosong).
+    """
+    tanggal = tanggal or datetime.now()
+    grafik = grafik or grafik_scan(analisis)
+    item_details = analisis["item_details"]
+    rekomendasi = analisis["rekomendasi"]
+
+    pdf = _kelas_pdf()()
+    pdf.add_page()
+    pdf.set_font("Arial", size=12)
+    pdf.cell(0, 10, f"Tanggal: {tanggal.strftime('%d-%m-%Y')}", ln=True)
+    pdf.cell(0, 10, f"Total Kalori: {analisis['total_kalori']} kkal", ln=True)
+    pdf.ln(5)
+
+    pdf.set_font("Arial", 'B', 12); pdf.cell(0, 10, "1. HASIL DETEKSI VISUAL", ln=True)
+    pdf.image_bytes("detected", encode_jpeg(img_res), x=10, w=100); pdf.ln(5)
+
+    pdf.cell(0, 10, "2. RINCIAN KOMPOSISI", ln=True)
+    pdf.set_font("Arial", 'B', 10)
+    pdf.cell(70, 10, "Item Menu", 1); pdf.cell(70, 10, "Kategori", 1); pdf.cell(40, 10, "Kalori", 1); pdf.ln()
+    pdf.set_font("Arial", size=10)
+    for item in item_details:
+        pdf.cell(70, 10, item[0], 1); pdf.cell(70, 10, item[1], 1); pdf.cell(40, 10, item[2], 1); pdf.ln()
+
+    pdf.ln(10)
+    pdf.set_font("Arial", 'B', 12); pdf.cell(0, 10, "3. GRAFIK KOMPOSISI", ln=True)
+    y_pos = pdf.get_y()
+    pdf.image_bytes("chart1", grafik["proporsi"], x=10, y=y_pos, w=80)
+    pdf.image_bytes("chart3", grafik["makro"], x=100, y=y_pos, w=80)
+    pdf.ln(65)
+
+    pdf.cell(0, 10, "4. REKOMENDASI", ln=True)
+    pdf.set_font("Arial", size=11)
+    if not rekomendasi: pdf.multi_cell(0, 7, "- Tidak ada catatan. Menu sudah sesuai standar.")
+    for rek in rekomendasi: pdf.multi_cell(0, 7, rek)
+
+    return pdf.output(dest='S').encode('latin-1')
+
+
+# LAPORAN HARIAN (SEMUA SCAN DALAM SATU HARI)
+def _komposisi_scan(scan):
+    """Jumlah item per kategori untuk satu scan dari database"""
+    menus = [m for m, _ in scan["items"]] or [m for m in (scan["detail_menu"] or "").split(", ") if m]
+    counts = [0] * len(KATEGORI)
+    for menu in menus:
+        counts[KATEGORI_PER_MENU.get(menu, len(KATEGORI) - 1)] += 1
+    return dict(zip(KATEGORI, counts))
+
+def buat_pdf_harian(tanggal=None):
+    """PDF gabungan semua scan pada satu hari, dibaca dari database"""
+    tanggal = tanggal or datetime.now()
+    scans = database.ambil_scan_harian(tanggal)
+
+    pdf = _kelas_pdf()()
+    pdf.add_page()
+    pdf.set_font("Arial", 'B', 12)
+    pdf.cell(0, 10, f"REKAP HARIAN: {tanggal.strftime('%d-%m-%Y')}", ln=True)
+    pdf.set_font("Arial", size=11)
+    if not scans:
+        pdf.cell(0, 10, "Belum ada data scan pada tanggal ini.", ln=True)
+        return pdf.output(dest='S').encode('latin-1')
+
+    # 1. Ringkasan
+    jumlah_scan = len(scans)
+    seimbang = sum(1 for s in scans if s["status_gizi"] == "Seimbang")
+    total_kalori = sum(s["total_kalori"] for s in scans)
+    pdf.cell(0, 8, f"Jumlah Scan: {jumlah_scan}", ln=True)
+    pdf.cell(0, 8, f"Rata-rata Kalori: {total_kalori // jumlah_scan} kkal", ln=True)
+    pdf.cell(0, 8, f"Menu Seimbang: {seimbang} ({100 * seimbang / jumlah_scan:.1f}%) | Kurang Lengkap: {jumlah_scan - seimbang}", ln=True)
+    pdf.ln(5)
+
+    menu_count = {}
+    for s in scans:
+        for menu, _ in s["items"]:
+            menu_count[menu] = menu_count.get(menu, 0) + 1
+    top_menu = sorted(menu_count.items(), key=lambda x: x[1])[-10:]
+
+    pdf.set_font("Arial", 'B', 12); pdf.cell(0, 10, "1. GRAFIK HARIAN", ln=True)
+    y_pos = pdf.get_y()
+    status = {"Seimbang": seimbang, "Kurang Lengkap": jumlah_scan - seimbang}
+    pdf.image_bytes("status", grafik_proporsi(status), x=10, y=y_pos, w=80)
+    if top_menu:
+        pdf.image_bytes("menu", grafik_menu([m for m, _ in top_menu], [n for _, n in top_menu]), x=100, y=y_pos, w=95)
+    pdf.set_y(y_pos + 65)
+
+    # 2. Rincian per scan; grafik proporsi yang identik (menu sama) hanya disematkan sekali
+    pdf.set_font("Arial", 'B', 12); pdf.cell(0, 10, "2. RINCIAN PER SCAN", ln=True)
+    for i, s in enumerate(scans, 1):
+        if pdf.get_y() > 230:
+            pdf.add_page()
+        komposisi = _komposisi_scan(s)
+        nama_grafik = "proporsi-" + "-".join(str(v) for v in komposisi.values())
+
+        y_pos = pdf.get_y()
+        pdf.image_bytes(nama_grafik, grafik_proporsi(komposisi), x=10, y=y_pos, w=40)
+        pdf.set_xy(55, y_pos)
+        pdf.set_font("Arial", 'B', 10)
+        pdf.cell(0, 7, f"Scan #{i} - {s['waktu'][11:]} | {s['total_kalori']} kkal | {s['status_gizi']}", ln=True)
+        pdf.set_font("Arial", size=9)
+        pdf.set_x(55)
+        pdf.multi_cell(0, 5, s["detail_menu"] or "-")
+        pdf.set_y(max(pdf.get_y(), y_pos + 32))
+
+    return pdf.output(dest='S').encode('latin-1')
+
+
+# PEKERJA LATAR BELAKANG
+def _terukur(fn, *args):
+    with metrik.ukur("pdf"):
+        return fn(*args)
+
+def minta_pdf_scan(img_res, analisis, grafik=None, tanggal=None):
+    """Menjadwalkan buat_pdf_scan di thread pekerja, mengembalikan Future berisi bytes PDF"""
+    return _executor.submit(_terukur, buat_pdf_scan, img_res, analisis, grafik, tanggal)
+
+def minta_pdf_harian(tanggal=None):
+    """Menjadwalkan buat_pdf_harian di thread pekerja, mengembalikan Future berisi bytes PDF"""
+    return _executor.submit(_terukur, buat_pdf_harian, tanggal)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cetak laporan harian MBG (semua scan dalam satu hari) ke PDF.")
+    parser.add_argument("--tanggal", default=None, help="Tanggal YYYY-MM-DD (default: hari ini)")
+    parser.add_argument("-o", "--output", default="Laporan_Harian_MBG.pdf", help="File PDF keluaran")
+    args = parser.parse_args(argv)
+
+    tanggal = datetime.strptime(args.tanggal, "%Y-%m-%d") if args.tanggal else None
+    with open(args.output, "wb") as f:
+        f.write(buat_pdf_harian(tanggal))
+    print(f"Laporan disimpan ke {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+"""Layanan inferensi bersama dengan antrian dan micro-batching.
+
+Permintaan dari banyak klien (sesi Streamlit, batch CLI, stream, terminal kantin
+lain) masuk ke satu antrian. Satu thread pekerja mengumpulkan permintaan yang
+datang berdekatan menjadi satu batch, sampai maks_batch citra atau sampai
+permintaan tertua sudah menunggu maks_tunggu. Citra dalam batch dikirim ke model
+per kelompok ukuran yang sama, sehingga letterbox (dan hasil deteksi) satu citra
+tidak bergantung pada citra lain yang kebetulan datang bersamaan. Jika antrian
+penuh, permintaan baru ditolak (AntrianPenuh / HTTP 503) alih-alih menumpuk
+latensi semua klien.
+
+Dipakai langsung di dalam proses (LayananInferensi) atau lewat HTTP:
+
+    python layanan.py --port 8500 --batch 8 --tunggu-ms 10
+    MBG_SERVER=http://localhost:8500 streamlit run app.py
+    python pipeline.py foto_dapur/ --server http://localhost:8500
+
+Metrik Prometheus (latensi per tahap, counter scan) tersedia di GET /metrics.
+"""
+import argparse
+import io
+import json
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+import numpy as np
+
+import metrik
+import pipeline
+
+MAKS_BATCH = 8
+MAKS_TUNGGU = 0.010  # detik
+MAKS_ANTRIAN = 64
+MAKS_BODY = 256 * 2**20  # byte per permintaan HTTP (juga batas total array setelah dibuka)
+
+
+class AntrianPenuh(RuntimeError):
+    """Antrian inferensi penuh; klien sebaiknya mencoba lagi sebentar kemudian"""
+
+
+class LayananInferensi:
+    """Antrian + pekerja micro-batch di sekitar satu model (YOLO dari pipeline.load_model).
+
+    Antarmukanya sama dengan model untuk pipeline (names, prediksi), sehingga bisa
+    langsung dipakai di deteksi_mentah, deteksi_tile, scan_batch, dan stream.
+    """
+
+    def __init__(self, model, maks_batch=MAKS_BATCH, maks_tunggu=MAKS_TUNGGU, maks_antrian=MAKS_ANTRIAN):
+        self.model = model
+        self.names = model.names
+        self.overrides = {"imgsz": pipeline.ukuran_input(model)}
+        self.maks_batch = maks_batch
+        self.maks_tunggu = maks_tunggu
+        self._antrian = queue.Queue(maxsize=maks_antrian)
+        self._lock = threading.Lock()
+        self._stats = {"permintaan": 0, "citra": 0, "batch": 0, "ditolak": 0}
+        self._pekerja = threading.Thread(target=self._loop, name="mbg-inferensi", daemon=True)
+        self._pekerja.start()
+
+    def kirim(self, citra_bgr):
+        """Memasukkan daftar citra BGR ke antrian, mengembalikan Future berisi daftar deteksi mentah"""
+        future = Future()
+        try:
+            self._antrian.put_nowait((list(citra_bgr), future, time.perf_counter()))
+        except queue.Full:
+            with self._lock:
+                self._stats["ditolak"] += 1
+            raise AntrianPenuh(f"Antrian inferensi penuh ({self._antrian.maxsize} permintaan)") from None
+        return future
+
+    def prediksi(self, citra_bgr, timeout=None):
+        """Seperti pipeline.prediksi_mentah, tetapi lewat antrian bersama"""
+        return self.kirim(citra_bgr).result(timeout)
+
+    def stats(self):
+        with self._lock:
+            s = dict(self._stats)
+        s["rata_batch"] = s["citra"] / s["batch"] if s["batch"] else 0.0
+        s["antrian"] = self._antrian.qsize()
+        return s
+
+    def tutup(self):
+        self._antrian.put(None)
+        self._pekerja.join()
+
+    def _ambil_batch(self):
+        """Permintaan pertama (blocking) + permintaan lain sampai batch penuh atau tenggat habis"""
+        item = self._antrian.get()
+        if item is None:
+            return None
+        batch, jumlah = [item], len(item[0])
+        tenggat = item[2] + self.maks_tunggu
+        while jumlah < self.maks_batch:
+            # Permintaan yang sudah mengantre selalu ikut; menunggu yang baru hanya sampai tenggat
+            sisa = tenggat - time.perf_counter()
+            try:
+                item = self._antrian.get(timeout=sisa) if sisa > 0 else self._antrian.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._antrian.put(None)  # berhenti setelah batch ini
+                break
+            batch.append(item)
+            jumlah += len(item[0])
+        return batch
+
+    def _prediksi(self, citra):
+        """Deteksi mentah per kelompok citra berukuran sama, masing-masing dipecah per maks_batch.
+
+        Ukuran letterbox YOLO untuk satu batch bergantung pada semua citra di dalamnya;
+        dengan ukuran seragam, hasil sebuah citra sama seperti jika ia datang sendirian.
+        Permintaan besar (mis. mode tile) tetap dipecah agar memori terbatas.
+        """
+        kelompok = {}
+        for i, img in enumerate(citra):
+            kelompok.setdefault(img.shape, []).append(i)
+        hasil = [None] * len(citra)
+        for indeks in kelompok.values():
+            for j in range(0, len(indeks), self.maks_batch):
+                potongan = indeks[j:j + self.maks_batch]
+                mentah = pipeline.prediksi_mentah(self.model, [citra[i] for i in potongan])
+                for i, m in zip(potongan, mentah):
+                    hasil[i] = m
+        return hasil
+
+    def _loop(self):
+        while True:
+            batch = self._ambil_batch()
+            if batch is None:
+                return
+            citra = [img for c, _, _ in batch for img in c]
+            mulai = time.perf_counter()
+            for _, _, t_masuk in batch:
+                metrik.amati("antrian", mulai - t_masuk)
+            try:
+                hasil = self._prediksi(citra)
+            except Exception as e:
+                if len(batch) == 1:
+                    batch[0][1].set_exception(e)
+                    continue
+                # Ulangi per permintaan agar satu citra bermasalah tidak menggugurkan permintaan lain
+                for c, future, _ in batch:
+                    try:
+                        future.set_result(self._prediksi(c))
+                    except Exception as e_permintaan:
+                        future.set_exception(e_permintaan)
+                continue
+            metrik.amati("prediksi_batch", time.perf_counter() - mulai)
+            i = 0
+            for c, future, _ in batch:
+                future.set_result(hasil[i:i + len(c)])
+                i += len(c)
+            with self._lock:
+                self._stats["permintaan"] += len(batch)
+                self._stats["citra"] += len(citra)
+                self._stats["batch"] += 1
+
+
+# HTTP
+# Citra dikirim sebagai array BGR mentah dalam .npz (tanpa kompresi lossy), sehingga
+# hasil deteksi lewat server identik dengan inferensi lokal.
+def _ke_npz(arrays):
+    buf = io.BytesIO()
+    np.savez(buf, **arrays)
+    return buf.getvalue()
+
+
+def _baca_citra(isi):
+    """Daftar citra dari body .npz klien; ValueError jika bukan citra BGR uint8 (H, W, 3)"""
+    try:
+        d = np.load(io.BytesIO(isi), allow_pickle=False)
+    except Exception as e:
+        raise ValueError(f"body bukan file .npz: {e}") from None
+    if not isinstance(d, np.lib.npyio.NpzFile):
+        raise ValueError("body bukan file .npz")
+    with d:
+        if not d.files:
+            raise ValueError("tidak ada citra")
+        # .npz boleh terkompresi: batasi juga ukuran array setelah dibuka
+        if sum(info.file_size for info in d.zip.infolist()) > MAKS_BODY:
+            raise ValueError(f"total citra melebihi {MAKS_BODY} byte")
+        citra = []
+        for i in range(len(d.files)):
+            try:
+                img = d[f"citra_{i}"]
+            except Exception as e:
+                raise ValueError(f"citra_{i} tidak terbaca: {e}") from None
+            if img.dtype != np.uint8 or img.ndim != 3 or img.shape[2] != 3 or not img.size:
+                raise ValueError(f"citra_{i} harus array uint8 (H, W, 3), bukan {img.dtype} {img.shape}")
+            citra.append(img)
+    return citra
+
+
+class KlienInferensi:
+    """Klien HTTP untuk layanan inferensi; antarmukanya sama dengan LayananInferensi"""
+
+    def __init__(self, url, timeout=60):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        with urlopen(f"{self.url}/info", timeout=timeout) as resp:
+            info = json.load(resp)
+        self.names = {int(k): v for k, v in info["names"].items()}
+        self.overrides = {"imgsz": info["imgsz"]}
+
+    def prediksi(self, citra_bgr):
+        citra_bgr = list(citra_bgr)
+        data = _ke_npz({f"citra_{i}": img for i, img in enumerate(citra_bgr)})
+        req = Request(f"{self.url}/prediksi", data=data, headers={"Content-Type": "application/octet-stream"})
+        try:
+            with urlopen(req, timeout=self.timeout) as resp:
+                isi = resp.read()
+        except HTTPError as e:
+            if e.code == 503:
+                raise AntrianPenuh("Server inferensi sedang penuh") from e
+            raise
+        with np.load(io.BytesIO(isi), allow_pickle=False) as d:
+            return [(d[f"xyxy_{i}"], d[f"conf_{i}"], d[f"cls_{i}"]) for i in range(len(citra_bgr))]
+
+    def stats(self):
+        with urlopen(f"{self.url}/stats", timeout=self.timeout) as resp:
+            return json.load(resp)
+
+
+def buat_server(layanan, host="0.0.0.0", port=8500):
+    """HTTP server berthread; tiap koneksi menunggu hasilnya di antrian bersama"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def _kirim(self, kode, isi, tipe):
+            self.send_response(kode)
+            self.send_header("Content-Type", tipe)
+            self.send_header("Content-Length", str(len(isi)))
+            if kode == 503:
+                self.send_header("Retry-After", "1")
+            self.end_headers()
+            self.wfile.write(isi)
+
+        def _json(self, kode, obj):
+            self._kirim(kode, json.dumps(obj).encode(), "application/json")
+
+        def do_GET(self):
+            if self.path == "/info":
+                self._json(200, {"names": layanan.names, "imgsz": layanan.overrides["imgsz"]})
+            elif self.path == "/stats":
+                self._json(200, layanan.stats())
+            elif self.path == "/metrics":
+                self._kirim(200, metrik.teks_prometheus().encode(), "text/plain; version=0.0.4")
+            else:
+                self._json(404, {"error": "tidak ditemukan"})
+
+        def do_POST(self):
+            if self.path != "/prediksi":
+                return self._json(404, {"error": "tidak ditemukan"})
+            try:
+                panjang = int(self.headers.get("Content-Length", ""))
+            except ValueError:
+                return self._json(400, {"error": "Content-Length tidak valid"})
+            if not 0 < panjang <= MAKS_BODY:
+                return self._json(400, {"error": f"Content-Length harus 1..{MAKS_BODY} byte"})
+            try:
+                citra = _baca_citra(self.rfile.read(panjang))
+            except ValueError as e:
+                return self._json(400, {"error": str(e)})
+            try:
+                hasil = layanan.prediksi(citra)
+            except AntrianPenuh as e:
+                return self._json(503, {"error": str(e)})
+            except Exception as e:
+                return self._json(500, {"error": f"{type(e).__name__}: {e}"})
+            keluaran = {}
+            for i, (xyxy, confs, cls_ids) in enumerate(hasil):
+                keluaran.update({f"xyxy_{i}": xyxy, f"conf_{i}": confs, f"cls_{i}": cls_ids})
+            self._kirim(200, _ke_npz(keluaran), "application/octet-stream")
+
+        def log_message(self, format, *args):
+            pass
+
+    return ThreadingHTTPServer((host, port), Handler)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Layanan inferensi MBG bersama (HTTP) dengan micro-batching.")
+    parser.add_argument("--model", default="best.pt", help="Path bobot YOLOv8 (default: best.pt)")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8500)
+    parser.add_argument("--batch", type=int, default=MAKS_BATCH, help=f"Maksimum citra per batch (default: {MAKS_BATCH})")
+    parser.add_argument("--tunggu-ms", type=float, default=MAKS_TUNGGU * 1000,
+                        help=f"Maksimum waktu tunggu pengisian batch (default: {MAKS_TUNGGU * 1000:.0f} ms)")
+    parser.add_argument("--antrian", type=int, default=MAKS_ANTRIAN,
+                        help=f"Maksimum permintaan dalam antrian sebelum ditolak 503 (default: {MAKS_ANTRIAN})")
+    args = parser.parse_args(argv)
+
+    layanan = LayananInferensi(pipeline.load_model(args.model), args.batch, args.tunggu_ms / 1000, args.antrian)
+    server = buat_server(layanan, args.host, args.port)
+    print(f"Layanan inferensi berjalan di http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        layanan.tutup()
+
+
+if __name__ == "__main__":
+    main()
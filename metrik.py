@@ -0,0 +1,164 @@
+"""Metrik performa pipeline: histogram latensi per tahap dan counter scan.
+
+Tahap yang diukur: praproses, prediksi, analisis, gambar, grafik, simpan (antre
+ke penulis DB), tulis_db (transaksi di thread penulis), pdf, serta antrian dan
+prediksi_batch di layanan inferensi. Waktu per tahap satu scan juga disimpan ke
+tabel waktu_tahap bersama baris riwayat-nya.
+
+Metrik diekspos dalam format teks Prometheus lewat GET /metrics di layanan.py,
+atau ditulis berkala ke file (MBG_METRIK_FILE, untuk textfile collector) oleh
+thread latar belakang setiap JEDA_TULIS_FILE detik selama ada metrik baru.
+"""
+import atexit
+import bisect
+import contextlib
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+BUCKET = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # detik
+SAMPEL_MAKS = 512  # sampel terbaru per tahap untuk p50/p95 di panel performa
+JEDA_TULIS_FILE = 5.0  # detik
+
+_lock = threading.Lock()
+_histogram = {}
+_counter = {"scan": 0, "deteksi": 0, "scan_kosong": 0}
+_versi = 0  # bertambah setiap ada pengamatan; file hanya ditulis ulang jika berubah
+_penulis_file = None
+
+
+class Histogram:
+    """Histogram kumulatif ala Prometheus + sampel terbaru untuk persentil"""
+
+    def __init__(self):
+        self.bucket = [0] * (len(BUCKET) + 1)
+        self.total = 0.0
+        self.n = 0
+        self.sampel = deque(maxlen=SAMPEL_MAKS)
+
+    def amati(self, detik):
+        self.bucket[bisect.bisect_left(BUCKET, detik)] += 1
+        self.total += detik
+        self.n += 1
+        self.sampel.append(detik)
+
+    def persentil(self, q):
+        urut = sorted(self.sampel)
+        return urut[min(int(q * len(urut)), len(urut) - 1)] if urut else 0.0
+
+
+def amati(tahap, detik):
+    global _versi
+    with _lock:
+        h = _histogram.get(tahap)
+        if h is None:
+            h = _histogram[tahap] = Histogram()
+        h.amati(detik)
+        _versi += 1
+        _mulai_penulis_file()
+
+@contextlib.contextmanager
+def ukur(tahap):
+    """Mengukur durasi blok with ke histogram tahap"""
+    mulai = time.perf_counter()
+    try:
+        yield
+    finally:
+        amati(tahap, time.perf_counter() - mulai)
+
+
+class WaktuScan:
+    """Waktu per tahap (ms) untuk satu scan; setiap pengukuran juga masuk histogram global"""
+
+    def __init__(self):
+        self.waktu = {}
+
+    @contextlib.contextmanager
+    def tahap(self, nama):
+        mulai = time.perf_counter()
+        try:
+            yield
+        finally:
+            detik = time.perf_counter() - mulai
+            self.waktu[nama] = self.waktu.get(nama, 0.0) + detik * 1000
+            amati(nama, detik)
+
+
+def catat_scan(jumlah_deteksi):
+    """Counter scan / deteksi / scan tanpa deteksi"""
+    global _versi
+    with _lock:
+        _counter["scan"] += 1
+        _counter["deteksi"] += jumlah_deteksi
+        _counter["scan_kosong"] += jumlah_deteksi == 0
+        _versi += 1
+        _mulai_penulis_file()
+
+
+def ringkasan():
+    """Statistik per tahap (ms) + counter, untuk panel performa"""
+    with _lock:
+        tahap = {
+            nama: {"n": h.n, "rata_ms": h.total / h.n * 1000, "p50_ms": h.persentil(0.5) * 1000,
+                   "p95_ms": h.persentil(0.95) * 1000}
+            for nama, h in _histogram.items() if h.n
+        }
+        return tahap, dict(_counter)
+
+
+def teks_prometheus():
+    """Semua metrik dalam format eksposisi teks Prometheus"""
+    baris = [
+        "# HELP mbg_tahap_detik Latensi per tahap pipeline deteksi MBG",
+        "# TYPE mbg_tahap_detik histogram",
+    ]
+    with _lock:
+        for nama, h in sorted(_histogram.items()):
+            kumulatif = 0
+            for batas, jumlah in zip(BUCKET + (float("inf"),), h.bucket):
+                kumulatif += jumlah
+                le = "+Inf" if batas == float("inf") else repr(batas)
+                baris.append(f'mbg_tahap_detik_bucket{{tahap="{nama}",le="{le}"}} {kumulatif}')
+            baris.append(f'mbg_tahap_detik_sum{{tahap="{nama}"}} {h.total:.6f}')
+            baris.append(f'mbg_tahap_detik_count{{tahap="{nama}"}} {h.n}')
+        for nama, keterangan in (("scan", "Jumlah scan"), ("deteksi", "Jumlah item terdeteksi"),
+                                 ("scan_kosong", "Jumlah scan tanpa deteksi")):
+            baris += [f"# HELP mbg_{nama}_total {keterangan}", f"# TYPE mbg_{nama}_total counter",
+                      f"mbg_{nama}_total {_counter[nama]}"]
+    return "\n".join(baris) + "\n"
+
+
+def tulis_file(path=None):
+    """Menulis metrik ke file (atomik) jika MBG_METRIK_FILE / path diisi"""
+    path = path or os.environ.get("MBG_METRIK_FILE")
+    if not path:
+        return
+    sementara = f"{path}.{os.getpid()}.tmp"
+    with open(sementara, "w") as f:
+        f.write(teks_prometheus())
+    os.replace(sementara, path)
+
+def _loop_tulis_file():
+    """Menulis file metrik setiap JEDA_TULIS_FILE detik jika ada metrik baru (tahap apa pun)"""
+    tertulis = -1
+    while True:
+        time.sleep(JEDA_TULIS_FILE)
+        versi = _versi
+        if versi == tertulis:
+            continue
+        try:
+            tulis_file()
+            tertulis = versi
+        except OSError as e:
+            print(f"[metrik] Gagal menulis file metrik: {e}", file=sys.stderr)
+
+def _mulai_penulis_file():
+    """Menyalakan thread penulis file sekali, saat metrik pertama tercatat (dipanggil dengan _lock)"""
+    global _penulis_file
+    if _penulis_file is None and os.environ.get("MBG_METRIK_FILE"):
+        _penulis_file = threading.Thread(target=_loop_tulis_file, name="mbg-metrik-file", daemon=True)
+        _penulis_file.start()
+
+atexit.register(tulis_file)
@@ -0,0 +1,505 @@
+"""Pipeline deteksi komposisi menu MBG tanpa UI (headless).
+
+Dipakai oleh app.py (Streamlit) dan bisa dijalankan langsung sebagai CLI
+untuk memindai banyak foto nampan sekaligus:
+
+    python pipeline.py foto_dapur/ --batch 16 --workers 4
+"""
+import argparse
+import functools
+import io
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+from PIL import Image
+
+import database
+import metrik
+from cache import hash_array, hash_bytes
+from gizi import hitung_gizi, tabel_gizi
+
+EKSTENSI_GAMBAR = (".jpg", ".jpeg", ".png")
+
+
+def load_model(path="best.pt", backend=None):
+    """Memuat model YOLOv8 pada backend terpilih (lihat backend.py; default dari MBG_BACKEND).
+
+    Import ultralytics ditunda agar worker praproses tetap ringan.
+    """
+    from backend import muat_model
+    return muat_model(path, backend)
+
+
+# FUNGSI PENGOLAHAN CITRA (PCD) & FILTER
+# Seluruh pipeline memakai urutan warna BGR (OpenCV & ultralytics): citra
+# didekode sekali dengan cv2.imdecode dan diteruskan ke model tanpa konversi
+# warna maupun PIL. Foto JPEG yang jauh lebih besar dari kebutuhan didekode
+# langsung pada skala 1/2, 1/4 atau 1/8 oleh libjpeg.
+SISI_MAKS = 1280  # sisi terpanjang minimum setelah dekode tereduksi (2x input model)
+_REDUKSI = ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4), (2, cv2.IMREAD_REDUCED_COLOR_2))
+
+_lokal = threading.local()
+
+def _buffer(nama, shape):
+    """Buffer kerja per thread yang dipakai ulang selama ukuran citra sama"""
+    buf = getattr(_lokal, nama, None)
+    if buf is None or buf.shape != shape:
+        buf = np.empty(shape, dtype=np.uint8)
+        setattr(_lokal, nama, buf)
+    return buf
+
+def _clahe():
+    if not hasattr(_lokal, "clahe"):
+        _lokal.clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
+    return _lokal.clahe
+
+def muat_citra(data, sisi_maks=SISI_MAKS):
+    """Dekode bytes JPEG/PNG sekali menjadi array BGR.
+
+    sisi_maks: jika sisi terpanjang foto >= 2x nilai ini, dekode langsung pada skala
+    tereduksi (tetap >= sisi_maks). None = selalu resolusi asli (mode tile).
+
+    Tag orientasi EXIF diabaikan, sama seperti jalur PIL lama (Image.open tanpa
+    exif_transpose). cv2 hanya memutar citra pada dekode resolusi penuh, sehingga
+    tanpa flag ini mode tile & mode standar akan melihat orientasi yang berbeda.
+    """
+    flag = cv2.IMREAD_COLOR
+    if sisi_maks:
+        # Hanya header yang dibaca untuk mengetahui ukuran
+        with Image.open(io.BytesIO(data)) as im:
+            sisi = max(im.size)
+        flag = next((f for skala, f in _REDUKSI if sisi // skala >= sisi_maks), flag)
+    img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), flag | cv2.IMREAD_IGNORE_ORIENTATION)
+    if img is None:
+        raise ValueError("Citra tidak dapat didekode")
+    return img
+
+def praproses(img_bgr, upscale=False):
+    """CLAHE + bilateral filter (+ Mode HD) langsung pada array BGR, hasil BGR baru.
+
+    img_bgr dipakai sebagai buffer kerja dan berisi hasil CLAHE setelah fungsi selesai.
+    """
+    # 1. CLAHE (Contrast Limited Adaptive Histogram Equalization) pada kanal Y
+    img_yuv = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2YUV, dst=_buffer("yuv", img_bgr.shape))
+    kanal_y = cv2.extractChannel(img_yuv, 0, dst=_buffer("y", img_bgr.shape[:2]))
+    cv2.insertChannel(_clahe().apply(kanal_y), img_yuv, 0)
+    img_enhanced = cv2.cvtColor(img_yuv, cv2.COLOR_YUV2BGR, dst=img_bgr)
+
+    # 2. Bilateral Filter
+    img_smooth = cv2.bilateralFilter(img_enhanced, 9, 75, 75)
+
+    if upscale:
+        # Super Resolution Simulation
+        height, width = img_smooth.shape[:2]
+        img_upscaled = cv2.resize(img_smooth, (width * 2, height * 2), interpolation=cv2.INTER_LANCZOS4)
+        gaussian = cv2.GaussianBlur(img_upscaled, (9, 9), 10.0, dst=_buffer("blur", img_upscaled.shape))
+        return cv2.addWeighted(img_upscaled, 1.5, gaussian, -0.5, 0, img_upscaled)
+    return img_smooth
+
+def process_image(pil_image, upscale=False):
+    """Versi PIL/RGB dari praproses, mengembalikan (img_enhanced, img_final) dalam RGB"""
+    img_cv = cv2.cvtColor(np.asarray(pil_image), cv2.COLOR_RGB2BGR)
+    img_final = praproses(img_cv, upscale)
+    return cv2.cvtColor(img_cv, cv2.COLOR_BGR2RGB), cv2.cvtColor(img_final, cv2.COLOR_BGR2RGB)
+
+def kunci_praproses(file_bytes, upscale, sisi_maks=SISI_MAKS):
+    """Kunci cache hasil praproses: hash isi file + mode HD + resolusi dekode"""
+    return f"{hash_bytes(file_bytes)}|{'hd' if upscale else 'std'}|{sisi_maks or 'asli'}"
+
+def encode_png(img_bgr):
+    """Encode citra BGR ke bytes PNG (untuk tombol download)"""
+    return cv2.imencode(".png", img_bgr)[1].tobytes()
+
+@functools.lru_cache(maxsize=8)
+def _prioritas(items):
+    priorities = np.full(max(cls_id for cls_id, _ in items) + 1, 2, dtype=np.int8)
+    for cls_id, label in items:
+        if label == "tray mbg": priorities[cls_id] = 1
+        if "nasi" in label: priorities[cls_id] = 3
+    priorities.flags.writeable = False
+    return priorities
+
+def prioritas_kelas(class_names):
+    """Prioritas per class id -> Barang Spesifik > Barang Umum (nasi 3, lauk/lainnya 2, tray 1)"""
+    items = class_names.items() if isinstance(class_names, dict) else enumerate(class_names)
+    return _prioritas(tuple(items))
+
+def smart_filter_indeks(xyxy, confs, cls_ids, priorities, overlap_thresh=0.5):
+    """Smart filter tervektorisasi, mengembalikan indeks kotak yang dipertahankan.
+
+    Dua kotak dianggap bertumpuk jika luas irisan / luas kotak terkecil > overlap_thresh.
+    Dari kotak yang bertumpuk, yang prioritasnya lebih rendah dibuang; jika prioritas
+    sama, yang confidence-nya lebih rendah dibuang (seri: urutan lebih awal menang).
+    """
+    n = len(confs)
+    if n == 0:
+        return np.empty(0, dtype=np.intp)
+
+    # Matriks tumpukan (irisan / luas minimum) untuk semua pasangan sekaligus
+    x1, y1, x2, y2 = xyxy.T
+    iw = np.clip(np.minimum(x2[:, None], x2[None, :]) - np.maximum(x1[:, None], x1[None, :]), 0, None)
+    ih = np.clip(np.minimum(y2[:, None], y2[None, :]) - np.maximum(y1[:, None], y1[None, :]), 0, None)
+    area = (x2 - x1) * (y2 - y1)
+    min_area = np.minimum(area[:, None], area[None, :])
+    overlap = np.divide(iw * ih, min_area, out=np.zeros((n, n), dtype=np.float32), where=min_area > 0)
+
+    # Peringkat total: prioritas tinggi > confidence tinggi > indeks kecil
+    order = np.lexsort((np.arange(n), -confs, -priorities[cls_ids]))
+    rank = np.empty(n, dtype=np.intp)
+    rank[order] = np.arange(n)
+
+    # Kotak i dibuang jika bertumpuk dengan kotak j yang peringkatnya lebih baik
+    kalah = (overlap > overlap_thresh) & (rank[None, :] < rank[:, None])
+    return np.flatnonzero(~kalah.any(axis=1))
+
+def smart_filter_boxes(boxes, class_names):
+    """Smart filter langsung dari results[0].boxes (seluruh tensor sekaligus)"""
+    xyxy, confs, cls_ids = boxes_ke_array(boxes)
+    priorities = prioritas_kelas(class_names)
+    keep = smart_filter_indeks(xyxy, confs, cls_ids, priorities)
+    return ekstrak_deteksi(xyxy[keep], confs[keep], cls_ids[keep], class_names, priorities)
+
+
+# DETEKSI & ANALISIS
+# Model dijalankan sekali per citra pada confidence terendah slider dan tanpa
+# NMS efektif (IoU 1.0), lalu ambang confidence & IoU pilihan user diterapkan
+# ulang di NumPy. Menggeser slider tidak perlu inferensi ulang. Batas jumlah kotak
+# mentah disamakan dengan max_nms ultralytics: tanpa NMS, kotak kembar ber-confidence
+# tinggi bisa memenuhi batas kecil dan menggeser item ber-confidence rendah, sehingga
+# hasil saring tidak lagi sama dengan predict(conf, iou, max_det=50).
+KONF_MINIMUM = 0.05
+MAX_DET_MENTAH = 30000
+
+def boxes_ke_array(boxes):
+    """Mengambil (xyxy, conf, cls) dari results[i].boxes sebagai array numpy"""
+    return (
+        boxes.xyxy.cpu().numpy().astype(np.float32),
+        boxes.conf.cpu().numpy().astype(np.float32),
+        boxes.cls.cpu().numpy().astype(int),
+    )
+
+def prediksi_mentah(model, citra_bgr):
+    """Deteksi mentah untuk daftar citra BGR sekaligus (satu batch).
+
+    model boleh berupa YOLO atau layanan inferensi bersama (layanan.py) yang
+    menggabungkan permintaan dari banyak klien menjadi micro-batch.
+    """
+    if hasattr(model, "prediksi"):
+        return model.prediksi(citra_bgr)
+    results = model.predict(citra_bgr, conf=KONF_MINIMUM, iou=1.0, agnostic_nms=False, max_det=MAX_DET_MENTAH, verbose=False)
+    return [boxes_ke_array(result.boxes) for result in results]
+
+def deteksi_mentah(model, img_bgr, cache=None, key=None):
+    """Deteksi mentah (belum disaring) untuk satu citra BGR, memakai cache bila ada.
+
+    key boleh diisi (mis. kunci_praproses) agar citra tidak perlu di-hash ulang.
+    """
+    if cache is not None:
+        key = key or hash_array(img_bgr)
+        mentah = cache.get(key)
+        if mentah is not None:
+            return mentah
+
+    mentah = prediksi_mentah(model, [img_bgr])[0]
+
+    if cache is not None:
+        cache.put(key, mentah)
+    return mentah
+
+# MODE TILE (RESOLUSI ASLI)
+# Alternatif Mode HD: citra asli dipotong menjadi tile berukuran input model yang
+# saling tumpang tindih dan dijalankan sebagai batch, ditambah satu lintasan global
+# (citra diperkecil ke ukuran input) untuk objek besar yang terpotong tile. Memori
+# dibatasi ukuran tile x batch, bukan ukuran citra.
+UKURAN_TILE = 640
+TUMPANG_TINDIH_TILE = 0.2
+BATCH_TILE = 16
+
+def ukuran_input(model, default=UKURAN_TILE):
+    """Ukuran input model (imgsz saat training) bila tersedia"""
+    imgsz = getattr(model, "overrides", {}).get("imgsz") or default
+    return int(imgsz if np.isscalar(imgsz) else max(imgsz))
+
+def posisi_tile(panjang, ukuran, overlap=TUMPANG_TINDIH_TILE):
+    """Titik awal tile sepanjang satu sumbu; tile terakhir rata dengan tepi citra"""
+    if panjang <= ukuran:
+        return [0]
+    langkah = max(1, int(ukuran * (1 - overlap)))
+    posisi = list(range(0, panjang - ukuran, langkah))
+    return posisi + [panjang - ukuran]
+
+def deteksi_tile(model, img_bgr, ukuran=None, overlap=TUMPANG_TINDIH_TILE, batch=BATCH_TILE, cache=None, key=None):
+    """Deteksi mentah mode tile untuk satu citra BGR, format sama dengan deteksi_mentah.
+
+    Kotak tile yang menyentuh tepi potongan (bukan tepi citra) dibuang karena objeknya
+    utuh di tile tetangga atau di lintasan global; sisanya digabung lewat NMS per
+    kelas di saring_deteksi.
+    """
+    if cache is not None:
+        key = (key or hash_array(img_bgr)) + "|tile"
+        mentah = cache.get(key)
+        if mentah is not None:
+            return mentah
+
+    ukuran = ukuran or ukuran_input(model)
+    h, w = img_bgr.shape[:2]
+    tiles = [(x, y) for y in posisi_tile(h, ukuran, overlap) for x in posisi_tile(w, ukuran, overlap)]
+    margin = 2.0
+    semua = []
+
+    # Lintasan global: objek besar (nasi, tray) yang tidak muat dalam satu tile
+    skala = ukuran / max(h, w)
+    if len(tiles) > 1:
+        kecil = cv2.resize(img_bgr, (round(w * skala), round(h * skala)), interpolation=cv2.INTER_AREA)
+        xyxy, confs, cls_ids = prediksi_mentah(model, [kecil])[0]
+        semua.append((xyxy / skala, confs, cls_ids))
+
+    for i in range(0, len(tiles), batch):
+        posisi = tiles[i:i + batch]
+        # Tile berupa view ke citra asli (tanpa salinan)
+        citra = [img_bgr[y:y + ukuran, x:x + ukuran] for x, y in posisi]
+        for (x, y), (xyxy, confs, cls_ids) in zip(posisi, prediksi_mentah(model, citra)):
+            th, tw = min(ukuran, h - y), min(ukuran, w - x)
+            potong = (((xyxy[:, 0] <= margin) & (x > 0)) | ((xyxy[:, 1] <= margin) & (y > 0))
+                      | ((xyxy[:, 2] >= tw - margin) & (x + tw < w)) | ((xyxy[:, 3] >= th - margin) & (y + th < h)))
+            xyxy = xyxy[~potong] + np.array([x, y, x, y], dtype=np.float32)
+            semua.append((xyxy, confs[~potong], cls_ids[~potong]))
+
+    mentah = (
+        np.concatenate([m[0] for m in semua]).astype(np.float32).reshape(-1, 4),
+        np.concatenate([m[1] for m in semua]).astype(np.float32),
+        np.concatenate([m[2] for m in semua]).astype(int),
+    )
+    if cache is not None:
+        cache.put(key, mentah)
+    return mentah
+
+def iou_matriks(a, b):
+    """IoU semua pasangan kotak a (n,4) x b (m,4)"""
+    iw = np.clip(np.minimum(a[:, None, 2], b[None, :, 2]) - np.maximum(a[:, None, 0], b[None, :, 0]), 0, None)
+    ih = np.clip(np.minimum(a[:, None, 3], b[None, :, 3]) - np.maximum(a[:, None, 1], b[None, :, 1]), 0, None)
+    inter = iw * ih
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+def nms_per_kelas(xyxy, scores, cls_ids, iou):
+    """Non-Maximum Suppression per kelas (class-aware), mengembalikan indeks yang dipertahankan"""
+    if len(scores) == 0:
+        return np.empty(0, dtype=np.intp)
+
+    # Geser kotak tiap kelas agar kotak beda kelas tidak pernah bertumpuk
+    offset = cls_ids.astype(np.float32)[:, None] * (float(xyxy.max()) + 1.0)
+    x1, y1, x2, y2 = (xyxy + offset).T
+    areas = (x2 - x1) * (y2 - y1)
+
+    order = np.argsort(-scores, kind="stable")
+    keep = []
+    while order.size > 0:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        w = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+        h = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None)
+        inter = w * h
+        union = np.maximum(areas[i] + areas[rest] - inter, 1e-9)
+        order = rest[inter / union <= iou]
+    return np.asarray(keep, dtype=np.intp)
+
+def saring_deteksi(mentah, conf, iou, max_det=50):
+    """Menerapkan ambang confidence + NMS per kelas pada deteksi mentah"""
+    xyxy, scores, cls_ids = mentah
+    mask = scores > conf
+    xyxy, scores, cls_ids = xyxy[mask], scores[mask], cls_ids[mask]
+    keep = nms_per_kelas(xyxy, scores, cls_ids, iou)[:max_det]
+    return xyxy[keep], scores[keep], cls_ids[keep]
+
+def ekstrak_deteksi(xyxy, confs, cls_ids, class_names, priorities):
+    """Mengubah array hasil deteksi menjadi daftar deteksi"""
+    detections = []
+    for (x1, y1, x2, y2), conf, cls_id in zip(xyxy, confs, cls_ids):
+        detections.append({
+            "box": [x1, y1, x2, y2],
+            "conf": float(conf),
+            "label": class_names[cls_id],
+            "cls_id": int(cls_id),
+            "priority": int(priorities[cls_id]),
+            "keep": True
+        })
+    return detections
+
+def analisis_deteksi(xyxy, confs, cls_ids, class_names, smart_filter=True):
+    """Deteksi (+ smart filter) dan ringkasan gizi untuk satu citra"""
+    priorities = prioritas_kelas(class_names)
+    if smart_filter:
+        keep = smart_filter_indeks(xyxy, confs, cls_ids, priorities)
+        xyxy, confs, cls_ids = xyxy[keep], confs[keep], cls_ids[keep]
+    detections = ekstrak_deteksi(xyxy, confs, cls_ids, class_names, priorities)
+    ringkasan = hitung_gizi(cls_ids, tabel_gizi(class_names))
+    ringkasan["detections"] = detections
+    return ringkasan
+
+def argumen_simpan(ringkasan):
+    """Argumen database.simpan_scan untuk satu ringkasan hasil analisis"""
+    deteksi = [
+        (d["cls_id"], item[0], d["conf"], *map(float, d["box"]), kalori)
+        for d, item, kalori in zip(ringkasan["detections"], ringkasan["item_details"], ringkasan["kalori_items"])
+    ]
+    return (ringkasan["total_kalori"], len(ringkasan["detections"]), ringkasan["status_db"],
+            ringkasan["item_details"], deteksi, ringkasan["found_types"])
+
+def analisis_hasil(result, class_names):
+    """Seperti analisis_deteksi, langsung dari hasil model.predict"""
+    return analisis_deteksi(*boxes_ke_array(result.boxes), class_names)
+
+
+# BATCH SCAN (BANYAK CITRA)
+def kumpulkan_file(inputs):
+    """Mengumpulkan path citra dari daftar file dan/atau folder"""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            for nama in sorted(os.listdir(item)):
+                if nama.lower().endswith(EKSTENSI_GAMBAR):
+                    paths.append(os.path.join(item, nama))
+        else:
+            paths.append(item)
+    return paths
+
+def _praproses_file(path, upscale, sisi_maks):
+    """Worker process pool: dekode citra dari disk lalu jalankan praproses (BGR).
+
+    Mengembalikan (citra, durasi detik); histogram di proses worker tidak terlihat
+    oleh proses utama, jadi durasinya dikirim balik.
+    """
+    mulai = time.perf_counter()
+    with open(path, "rb") as f:
+        img = praproses(muat_citra(f.read(), sisi_maks), upscale=upscale)
+    return img, time.perf_counter() - mulai
+
+def _praproses_paralel(paths, upscale, workers, maks_antrian, sisi_maks=SISI_MAKS):
+    """Menjalankan praproses di process pool, hasil dikembalikan berurutan.
+
+    Jumlah citra yang sedang diproses dibatasi maks_antrian agar memori tidak
+    membengkak saat praproses lebih cepat daripada inferensi. Menghasilkan
+    (path, (citra, durasi), None), atau (path, None, galat) untuk file yang gagal.
+    """
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        antrian = deque()
+        sisa = iter(paths)
+        for path in sisa:
+            antrian.append((path, pool.submit(_praproses_file, path, upscale, sisi_maks)))
+            if len(antrian) >= maks_antrian: break
+        while antrian:
+            path, future = antrian.popleft()
+            nxt = next(sisa, None)
+            if nxt is not None:
+                antrian.append((nxt, pool.submit(_praproses_file, nxt, upscale, sisi_maks)))
+            try:
+                hasil = future.result()
+            except Exception as e:  # file rusak / tidak terbaca: dilaporkan, citra lain jalan terus
+                yield path, None, e
+                continue
+            yield path, hasil, None
+
+def scan_batch(paths, model, conf=0.15, iou=0.45, batch_size=8, workers=None, upscale=False, simpan=True, tile=False):
+    """Memindai banyak citra: praproses paralel, inferensi per batch, simpan massal ke riwayat.
+
+    tile=True: setiap citra dideteksi dengan mode tile (batch = tile-tile citra tersebut).
+    File yang gagal dibaca / didekode dilewati tanpa menghentikan batch.
+    Mengembalikan (daftar ringkasan per citra, durasi dalam detik, daftar (path, galat) yang gagal).
+    """
+    hasil = []
+    gagal = []
+    mulai = time.perf_counter()
+
+    def proses_batch(batch):
+        mulai = time.perf_counter()
+        if tile:
+            deteksi = [saring_deteksi(deteksi_tile(model, img, batch=batch_size), conf, iou) for _, img, _ in batch]
+        else:
+            citra = [img for _, img, _ in batch]
+            deteksi = [saring_deteksi(mentah, conf, iou) for mentah in prediksi_mentah(model, citra)]
+        # Waktu prediksi per citra = rata-rata dalam batch
+        detik_prediksi = (time.perf_counter() - mulai) / len(batch)
+        baris_db = []
+        for (path, _, detik_praproses), (xyxy, confs, cls_ids) in zip(batch, deteksi):
+            waktu = metrik.WaktuScan()
+            for tahap, detik in (("praproses", detik_praproses), ("prediksi", detik_prediksi)):
+                waktu.waktu[tahap] = detik * 1000
+                metrik.amati(tahap, detik)
+            with waktu.tahap("analisis"):
+                ringkasan = analisis_deteksi(xyxy, confs, cls_ids, model.names)
+            metrik.catat_scan(len(ringkasan["detections"]))
+            ringkasan["file"] = path
+            ringkasan["waktu_tahap"] = waktu.waktu
+            hasil.append(ringkasan)
+            if ringkasan["detections"]:
+                baris_db.append((*argumen_simpan(ringkasan), waktu.waktu))
+        if simpan and baris_db:
+            with metrik.ukur("simpan"):
+                database.simpan_banyak_scan(baris_db)
+
+    batch = []
+    sisi_maks = None if tile else SISI_MAKS
+    for path, praproses_file, galat in _praproses_paralel(paths, upscale, workers, batch_size * 2, sisi_maks):
+        if galat is not None:
+            gagal.append((path, galat))
+            continue
+        img_ready, detik_praproses = praproses_file
+        batch.append((path, img_ready, detik_praproses))
+        if len(batch) == batch_size:
+            proses_batch(batch)
+            batch = []
+    if batch:
+        proses_batch(batch)
+
+    return hasil, time.perf_counter() - mulai, gagal
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch scan komposisi menu MBG dari folder atau daftar file.")
+    parser.add_argument("inputs", nargs="+", help="File citra dan/atau folder berisi citra (.jpg/.jpeg/.png)")
+    parser.add_argument("--model", default="best.pt", help="Path bobot YOLOv8 (default: best.pt)")
+    parser.add_argument("--conf", type=float, default=0.15, help="Ambang confidence (default: 0.15)")
+    parser.add_argument("--iou", type=float, default=0.45, help="Ambang IoU NMS (default: 0.45)")
+    parser.add_argument("--batch", type=int, default=8, help="Jumlah citra per panggilan model (default: 8)")
+    parser.add_argument("--workers", type=int, default=None, help="Jumlah proses praproses (default: jumlah CPU)")
+    parser.add_argument("--hd", action="store_true", help="Aktifkan Mode HD (upscale 2x + sharpening)")
+    parser.add_argument("--tile", action="store_true", help="Mode tile: deteksi pada resolusi asli dengan tile berukuran input model")
+    parser.add_argument("--no-db", action="store_true", help="Jangan simpan hasil ke tabel riwayat")
+    parser.add_argument("--server", default=None, help="URL layanan inferensi bersama (python layanan.py); model lokal tidak dimuat")
+    args = parser.parse_args(argv)
+
+    paths = kumpulkan_file(args.inputs)
+    if not paths:
+        parser.error("Tidak ada citra yang ditemukan.")
+
+    database.init_db()
+    if args.server:
+        from layanan import KlienInferensi
+        model = KlienInferensi(args.server)
+    else:
+        model = load_model(args.model)
+    hasil, durasi, gagal = scan_batch(paths, model, conf=args.conf, iou=args.iou, batch_size=args.batch,
+                               workers=args.workers, upscale=args.hd, simpan=not args.no_db, tile=args.tile)
+
+    for ringkasan in hasil:
+        menu = ", ".join(x[0] for x in ringkasan["item_details"]) or "-"
+        print(f"{ringkasan['file']}: {ringkasan['total_kalori']} kkal | {ringkasan['status_db']} | {menu}")
+    for path, galat in gagal:
+        print(f"{path}: DILEWATI ({galat})", file=sys.stderr)
+    print(f"\n{len(hasil)} citra dalam {durasi:.2f} detik ({len(hasil) / durasi:.2f} citra/detik)"
+          + (f", {len(gagal)} file gagal dibaca" if gagal else ""))
+    for tahap, r in metrik.ringkasan()[0].items():
+        print(f"  {tahap:>10}: rata-rata {r['rata_ms']:8.1f} ms | p95 {r['p95_ms']:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
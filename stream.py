@@ -0,0 +1,359 @@
+"""Mode stream kontinu: analisis nampan otomatis dari kamera / file video.
+
+Frame dibaca di thread tersendiri (frame lama dibuang jika deteksi tertinggal),
+deteksi berjalan asinkron di thread lain, lalu nampan dan item dilacak antar
+frame sehingga setiap nampan hanya dihitung & disimpan sekali lewat simpan_scan.
+
+    python stream.py --source video_konveyor.mp4
+    python stream.py --source 0            # webcam pertama
+"""
+import argparse
+import threading
+import time
+from collections import Counter, deque
+
+import cv2
+import numpy as np
+
+import database
+import layanan
+import metrik
+import pipeline
+
+LABEL_NAMPAN = "tray mbg"
+
+
+class Jejak:
+    """Satu objek yang dilacak antar frame"""
+
+    def __init__(self, id_, box, conf, cls_id):
+        self.id = id_
+        self.box = box
+        self.conf = conf
+        self.kelas = Counter({cls_id: 1})
+        self.hits = 1
+        self.hilang = 0
+        self.nampan_id = None
+
+    @property
+    def cls_id(self):
+        """Kelas mayoritas selama dilacak (tahan terhadap label yang berkedip)"""
+        return self.kelas.most_common(1)[0][0]
+
+
+class PelacakIoU:
+    """Pelacak multi-objek sederhana: pencocokan greedy berdasarkan IoU antar frame"""
+
+    def __init__(self, iou_min=0.2, max_hilang=10):
+        self.iou_min = iou_min
+        self.max_hilang = max_hilang
+        self.jejak = []
+        self._id_berikut = 1
+
+    def update(self, xyxy, confs, cls_ids):
+        """Mencocokkan deteksi frame ini dengan jejak aktif; mengembalikan jejak yang baru hilang"""
+        cocok_jejak, cocok_det = set(), set()
+        if self.jejak and len(confs):
+            iou = pipeline.iou_matriks(np.array([j.box for j in self.jejak]), xyxy)
+            for ti, di in zip(*np.unravel_index(np.argsort(-iou, axis=None), iou.shape)):
+                if iou[ti, di] < self.iou_min:
+                    break
+                if ti in cocok_jejak or di in cocok_det:
+                    continue
+                j = self.jejak[ti]
+                j.box, j.conf = xyxy[di], max(j.conf, float(confs[di]))
+                j.kelas[int(cls_ids[di])] += 1
+                j.hits += 1
+                j.hilang = 0
+                cocok_jejak.add(ti); cocok_det.add(di)
+
+        for ti, j in enumerate(self.jejak):
+            if ti not in cocok_jejak:
+                j.hilang += 1
+        for di in range(len(confs)):
+            if di not in cocok_det:
+                self.jejak.append(Jejak(self._id_berikut, xyxy[di], float(confs[di]), int(cls_ids[di])))
+                self._id_berikut += 1
+
+        selesai = [j for j in self.jejak if j.hilang > self.max_hilang]
+        self.jejak = [j for j in self.jejak if j.hilang <= self.max_hilang]
+        return selesai
+
+
+class StreamScanner:
+    """Pembaca frame + detektor asinkron + pelacak nampan untuk satu sumber video.
+
+    realtime=True: frame dibaca sesuai FPS sumber dan frame yang tertinggal dibuang
+    (perilaku kamera). realtime=False: setiap frame file diproses (tanpa drop).
+    maks_idle (detik, opsional): stream berhenti sendiri jika stats() tidak dipanggil
+    selama itu, mis. sesi aplikasi yang memantaunya sudah ditutup.
+    """
+
+    def __init__(self, model, source, conf=0.15, iou=0.45, upscale=False, praproses=True,
+                 simpan=True, realtime=True, min_hits=3, max_hilang=10, maks_idle=None):
+        self.model = model
+        self.source = int(source) if str(source).isdigit() else source
+        self.conf, self.iou = conf, iou
+        self.upscale = upscale
+        self.praproses = praproses
+        self.simpan = simpan
+        self.realtime = realtime
+        self.min_hits = min_hits
+        self.maks_idle = maks_idle
+        self._dipantau = time.monotonic()  # pemanggilan stats() terakhir
+
+        self.nampan = PelacakIoU(max_hilang=max_hilang)
+        self.item = PelacakIoU(max_hilang=max_hilang)
+        self._item_selesai = {}  # nampan_id -> jejak item yang sudah keluar frame sebelum nampannya
+        self.hasil = []  # ringkasan per nampan yang sudah dihitung
+        self.frame_anotasi = None
+
+        self._slot = None  # (frame_bgr, waktu_tangkap) terbaru
+        self._cv = threading.Condition()
+        self._berhenti = threading.Event()
+        self._eof = False
+        self._threads = []
+
+        self.frame_dibaca = 0
+        self.frame_dibuang = 0
+        self.frame_diproses = 0
+        self._waktu_proses = deque(maxlen=120)
+        self._latensi = deque(maxlen=120)
+        self._mulai = None
+
+    # --- kontrol ---
+    def start(self):
+        self._mulai = time.perf_counter()
+        self._dipantau = time.monotonic()
+        self._threads = [
+            threading.Thread(target=self._baca, name="mbg-stream-baca", daemon=True),
+            threading.Thread(target=self._deteksi, name="mbg-stream-deteksi", daemon=True),
+        ]
+        for t in self._threads:
+            t.start()
+        return self
+
+    def stop(self):
+        self._berhenti.set()
+        with self._cv:
+            self._cv.notify_all()
+        for t in self._threads:
+            t.join()
+
+    def join(self):
+        """Menunggu sampai sumber habis (file video) dan semua frame selesai diproses"""
+        for t in self._threads:
+            t.join()
+
+    @property
+    def berjalan(self):
+        return any(t.is_alive() for t in self._threads)
+
+    def stats(self):
+        """FPS yang tercapai dan latensi end-to-end (tangkap frame -> hasil pelacakan)"""
+        self._dipantau = time.monotonic()
+        durasi = max(time.perf_counter() - (self._mulai or time.perf_counter()), 1e-9)
+        proses = list(self._waktu_proses)
+        fps = (len(proses) - 1) / (proses[-1] - proses[0]) if len(proses) > 1 and proses[-1] > proses[0] else 0.0
+        latensi = np.array(self._latensi) * 1000 if self._latensi else np.zeros(1)
+        return {
+            "fps_baca": self.frame_dibaca / durasi,
+            "fps_deteksi": fps,
+            "latensi_p50_ms": float(np.percentile(latensi, 50)),
+            "latensi_p95_ms": float(np.percentile(latensi, 95)),
+            "frame_dibaca": self.frame_dibaca,
+            "frame_diproses": self.frame_diproses,
+            "frame_dibuang": self.frame_dibuang,
+            "jumlah_nampan": len(self.hasil),
+        }
+
+    # --- thread pembaca ---
+    def _baca(self):
+        cap = cv2.VideoCapture(self.source)
+        interval = 0.0
+        if self.realtime and isinstance(self.source, str) and "://" not in self.source:
+            fps = cap.get(cv2.CAP_PROP_FPS)
+            interval = 1.0 / fps if fps and fps > 0 else 0.0
+        berikut = time.perf_counter()
+        try:
+            while not self._berhenti.is_set():
+                if self.maks_idle is not None and time.monotonic() - self._dipantau > self.maks_idle:
+                    break  # tidak ada yang memantau lagi: selesai seperti akhir file
+                ok, frame = cap.read()
+                if not ok:
+                    break
+                with self._cv:
+                    if not self.realtime:
+                        # Mode file tanpa drop: tunggu sampai frame sebelumnya diambil detektor
+                        while self._slot is not None and not self._berhenti.is_set():
+                            self._cv.wait(0.1)
+                    elif self._slot is not None:
+                        self.frame_dibuang += 1
+                    self._slot = (frame, time.perf_counter())
+                    self.frame_dibaca += 1
+                    self._cv.notify_all()
+                if interval:
+                    berikut += interval
+                    time.sleep(max(berikut - time.perf_counter(), 0))
+        finally:
+            cap.release()
+            with self._cv:
+                self._eof = True
+                self._cv.notify_all()
+
+    # --- thread detektor ---
+    def _deteksi(self):
+        try:
+            self._loop_deteksi()
+        finally:
+            # Detektor berhenti (termasuk karena error): lepaskan pembaca yang sedang menunggu
+            self._berhenti.set()
+            with self._cv:
+                self._cv.notify_all()
+
+    def _loop_deteksi(self):
+        while True:
+            with self._cv:
+                while self._slot is None and not self._eof and not self._berhenti.is_set():
+                    self._cv.wait(0.1)
+                if self._slot is None or self._berhenti.is_set():
+                    break
+                frame, waktu_tangkap = self._slot
+                self._slot = None
+                self._cv.notify_all()
+
+            try:
+                self._proses_frame(frame)
+            except layanan.AntrianPenuh:
+                # Layanan inferensi bersama sedang penuh: frame ini ikut dibuang
+                self.frame_dibuang += 1
+                continue
+            self.frame_diproses += 1
+            selesai = time.perf_counter()
+            self._waktu_proses.append(selesai)
+            self._latensi.append(selesai - waktu_tangkap)
+
+        # Sumber habis / dihentikan: nampan yang masih aktif dihitung juga
+        for nampan in self.nampan.jejak:
+            self._hitung_nampan(nampan)
+        self.nampan.jejak = []
+
+    def _proses_frame(self, frame_bgr):
+        names = self.model.names
+        img = frame_bgr
+        if self.praproses:
+            with metrik.ukur("praproses"):
+                img = pipeline.praproses(frame_bgr, upscale=self.upscale)
+        with metrik.ukur("prediksi"):
+            mentah = pipeline.prediksi_mentah(self.model, [img])[0]
+        xyxy, confs, cls_ids = pipeline.saring_deteksi(mentah, self.conf, self.iou)
+
+        # Nampan dipisah sebelum smart filter: item selalu berada di dalam nampan, sehingga
+        # nampan (prioritas terendah) akan terbuang jika ikut disaring
+        is_nampan = np.array([names[c] == LABEL_NAMPAN for c in cls_ids], dtype=bool)
+        box_nampan, conf_nampan = xyxy[is_nampan], confs[is_nampan]
+        xyxy, confs, cls_ids = xyxy[~is_nampan], confs[~is_nampan], cls_ids[~is_nampan]
+        keep = pipeline.smart_filter_indeks(xyxy, confs, cls_ids, pipeline.prioritas_kelas(names))
+        xyxy, confs, cls_ids = xyxy[keep], confs[keep], cls_ids[keep]
+        if not len(box_nampan) and len(confs):
+            # Model tidak mendeteksi nampan: gabungan semua item dianggap satu nampan
+            box_nampan = np.concatenate([xyxy[:, :2].min(axis=0), xyxy[:, 2:].max(axis=0)])[None, :]
+            conf_nampan = np.ones(1, dtype=np.float32)
+
+        for nampan in self.nampan.update(box_nampan, conf_nampan, np.zeros(len(conf_nampan), dtype=int)):
+            self._hitung_nampan(nampan)
+        for j in self.item.update(xyxy, confs, cls_ids):
+            if j.nampan_id is not None:
+                self._item_selesai.setdefault(j.nampan_id, []).append(j)
+
+        # Item masuk ke nampan yang memuat titik tengahnya
+        for j in self.item.jejak:
+            if j.hilang:
+                continue
+            cx, cy = (j.box[0] + j.box[2]) / 2, (j.box[1] + j.box[3]) / 2
+            for nampan in self.nampan.jejak:
+                x1, y1, x2, y2 = nampan.box
+                if x1 <= cx <= x2 and y1 <= cy <= y2:
+                    j.nampan_id = nampan.id
+                    break
+
+        self.frame_anotasi = self._anotasi(img)
+
+    def _hitung_nampan(self, nampan):
+        """Nampan keluar dari frame: ringkas item di dalamnya dan simpan sekali"""
+        # Item yang sudah keluar frame lebih dulu tetap milik nampan ini
+        items = self._item_selesai.pop(nampan.id, [])
+        if nampan.hits < self.min_hits:
+            # Nampan tidak dihitung: lepaskan item aktifnya agar tidak lagi menunjuk id ini
+            for j in self.item.jejak:
+                if j.nampan_id == nampan.id:
+                    j.nampan_id = None
+            return
+        items += [j for j in self.item.jejak if j.nampan_id == nampan.id]
+        self.item.jejak = [j for j in self.item.jejak if j.nampan_id != nampan.id]
+        items = [j for j in items if j.hits >= self.min_hits]
+        if not items:
+            return
+        xyxy = np.array([j.box for j in items], dtype=np.float32)
+        confs = np.array([j.conf for j in items], dtype=np.float32)
+        cls_ids = np.array([j.cls_id for j in items], dtype=int)
+        analisis = pipeline.analisis_deteksi(xyxy, confs, cls_ids, self.model.names, smart_filter=False)
+        analisis["nampan_id"] = nampan.id
+        self.hasil.append(analisis)
+        metrik.catat_scan(len(items))
+        if self.simpan:
+            with metrik.ukur("simpan"):
+                database.simpan_scan(*pipeline.argumen_simpan(analisis))
+
+    def _anotasi(self, img_res):
+        """Menggambar jejak langsung pada citra frame ini (BGR, milik thread detektor)"""
+        for nampan in self.nampan.jejak:
+            x1, y1, x2, y2 = map(int, nampan.box)
+            cv2.rectangle(img_res, (x1, y1), (x2, y2), (0, 165, 255), 2)
+            cv2.putText(img_res, f"Nampan #{nampan.id}", (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 165, 255), 2)
+        for j in self.item.jejak:
+            if j.hilang:
+                continue
+            x1, y1, x2, y2 = map(int, j.box)
+            cv2.rectangle(img_res, (x1, y1), (x2, y2), (0, 255, 0), 2)
+            cv2.putText(img_res, f"{self.model.names[j.cls_id]} #{j.id}", (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+        return img_res
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analisis nampan MBG otomatis dari kamera atau file video.")
+    parser.add_argument("--source", default="0", help="Indeks kamera, path file video, atau URL stream (default: 0)")
+    parser.add_argument("--model", default="best.pt", help="Path bobot YOLOv8 (default: best.pt)")
+    parser.add_argument("--conf", type=float, default=0.15, help="Ambang confidence (default: 0.15)")
+    parser.add_argument("--iou", type=float, default=0.45, help="Ambang IoU NMS (default: 0.45)")
+    parser.add_argument("--tanpa-praproses", action="store_true", help="Lewati CLAHE + bilateral filter per frame")
+    parser.add_argument("--semua-frame", action="store_true", help="File video: proses setiap frame (tanpa drop, tidak real-time)")
+    parser.add_argument("--no-db", action="store_true", help="Jangan simpan hasil ke tabel riwayat")
+    args = parser.parse_args(argv)
+
+    database.init_db()
+    scanner = StreamScanner(pipeline.load_model(args.model), args.source, conf=args.conf, iou=args.iou,
+                            praproses=not args.tanpa_praproses, simpan=not args.no_db,
+                            realtime=not args.semua_frame).start()
+    dicetak = 0
+    try:
+        while scanner.berjalan:
+            time.sleep(1.0)
+            for analisis in scanner.hasil[dicetak:]:
+                menu = ", ".join(x[0] for x in analisis["item_details"])
+                print(f"Nampan #{analisis['nampan_id']}: {analisis['total_kalori']} kkal | {analisis['status_db']} | {menu}")
+            dicetak = len(scanner.hasil)
+            s = scanner.stats()
+            print(f"  [{s['fps_deteksi']:.1f} FPS deteksi | latensi p50 {s['latensi_p50_ms']:.0f} ms, "
+                  f"p95 {s['latensi_p95_ms']:.0f} ms | frame dibuang {s['frame_dibuang']}]")
+    except KeyboardInterrupt:
+        scanner.stop()
+    scanner.join()
+    for analisis in scanner.hasil[dicetak:]:
+        menu = ", ".join(x[0] for x in analisis["item_details"])
+        print(f"Nampan #{analisis['nampan_id']}: {analisis['total_kalori']} kkal | {analisis['status_db']} | {menu}")
+    print(f"\nTotal nampan: {len(scanner.hasil)} | {scanner.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Uji batas byte & penggusuran ByteBudgetCache (memori dan tier spill ke disk).
+
+    python -m unittest discover tests
+"""
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from cache import ByteBudgetCache
+
+KB = 1024
+
+
+def blok(nilai, ukuran=KB):
+    return np.full(ukuran, nilai, dtype=np.uint8)
+
+
+class TestByteBudgetCache(unittest.TestCase):
+    def setUp(self):
+        self._folder = tempfile.TemporaryDirectory()
+        self.folder = self._folder.name
+
+    def tearDown(self):
+        self._folder.cleanup()
+
+    def file_spill(self):
+        return sorted(f for f in os.listdir(self.folder) if f.endswith((".npy", ".bin")))
+
+    def test_batas_memori_menggusur_entri_terlama(self):
+        cache = ByteBudgetCache(max_bytes=3 * KB)
+        for i in range(3):
+            cache.put(f"k{i}", blok(i))
+        cache.get("k0")  # k0 baru dipakai: k1 yang tergusur lebih dulu
+        cache.put("k3", blok(3))
+
+        self.assertLessEqual(cache.nbytes, 3 * KB)
+        self.assertNotIn("k1", cache)
+        for key in ("k0", "k2", "k3"):
+            self.assertIn(key, cache)
+
+    def test_entri_tergusur_dimuat_ulang_dari_disk(self):
+        cache = ByteBudgetCache(max_bytes=2 * KB, spill_dir=self.folder)
+        cache.put("a", blok(1))
+        cache.put("b", b"x" * KB)
+        cache.put("c", blok(3))
+        cache.put("d", blok(4))
+
+        self.assertEqual(len(self.file_spill()), 2)
+        self.assertEqual(cache.get("b"), b"x" * KB)
+        a = cache.get("a")
+        np.testing.assert_array_equal(a, blok(1))
+        self.assertFalse(a.flags.writeable)
+
+    def test_batas_disk_menghapus_file_terlama(self):
+        cache = ByteBudgetCache(max_bytes=KB, spill_dir=self.folder, max_disk_bytes=3 * KB)
+        for i in range(6):
+            cache.put(f"k{i}", b"x" * KB)
+
+        self.assertLessEqual(cache.disk_nbytes, 3 * KB)
+        self.assertEqual(len(self.file_spill()), 3)
+        self.assertIsNone(cache.get("k0"))
+        self.assertEqual(cache.get("k4"), b"x" * KB)
+
+    def test_entri_lebih_besar_dari_batas_memori_langsung_ke_disk(self):
+        cache = ByteBudgetCache(max_bytes=KB, spill_dir=self.folder, max_disk_bytes=4 * KB)
+        cache.put("besar", b"x" * (2 * KB))
+        cache.put("raksasa", b"x" * (8 * KB))
+
+        self.assertEqual(cache.nbytes, 0)
+        self.assertIn("besar", cache)
+        self.assertNotIn("raksasa", cache)
+
+    def test_file_proses_sebelumnya_diindeks_dan_ikut_batas_disk(self):
+        lama = ByteBudgetCache(max_bytes=KB, spill_dir=self.folder)
+        for i in range(5):
+            lama.put(f"k{i}", b"x" * KB)
+        self.assertEqual(len(self.file_spill()), 4)
+        for i in range(4):  # k0..k3 di disk (k4 masih di memori); urutan mtime = urutan spill
+            path = os.path.join(self.folder, f"{ByteBudgetCache._nama(f'k{i}')}.bin")
+            os.utime(path, (1000 + i, 1000 + i))
+        with open(os.path.join(self.folder, "sisa.npy.123.tmp"), "wb") as f:
+            f.write(b"terputus")
+
+        baru = ByteBudgetCache(max_bytes=KB, spill_dir=self.folder, max_disk_bytes=2 * KB)
+        self.assertEqual(baru.disk_nbytes, 2 * KB)
+        self.assertEqual(len(os.listdir(self.folder)), 2)
+        self.assertIsNone(baru.get("k0"))
+        self.assertEqual(baru.get("k3"), b"x" * KB)
+
+        baru.clear()
+        self.assertEqual(os.listdir(self.folder), [])
+
+    def test_file_spill_hilang_dianggap_tidak_ada(self):
+        cache = ByteBudgetCache(max_bytes=KB, spill_dir=self.folder)
+        cache.put("a", b"x" * KB)
+        cache.put("b", b"y" * KB)
+        for nama in self.file_spill():
+            os.remove(os.path.join(self.folder, nama))
+
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.disk_nbytes, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
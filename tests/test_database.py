@@ -0,0 +1,137 @@
+"""Uji penulis latar belakang database (SQLite sementara).
+
+    python -m unittest discover tests
+"""
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import database
+
+SCAN = (560, 2, "Lengkap", [("Nasi Putih", "Karbohidrat", "175 kkal"), ("Ayam Goreng", "Protein", "200 kkal")])
+# Scan lengkap dengan deteksi & found_types, seperti pipeline.argumen_simpan
+ITEM_SEIMBANG = [("Nasi Putih", "Karbohidrat", "175 kkal"), ("Sayur Bayam", "Sayuran", "40 kkal"),
+                 ("Ayam Goreng", "Protein Hewani", "200 kkal"), ("Pisang", "Buah", "90 kkal")]
+DETEKSI_SEIMBANG = [(0, "Nasi Putih", 0.9, 0, 0, 10, 10, 175), (1, "Sayur Bayam", 0.9, 0, 0, 10, 10, 40),
+                    (2, "Ayam Goreng", 0.9, 0, 0, 10, 10, 200), (3, "Pisang", 0.9, 0, 0, 10, 10, 90)]
+SCAN_SEIMBANG = (505, 4, "Seimbang", ITEM_SEIMBANG, DETEKSI_SEIMBANG, {"Karbo", "Sayur", "Protein", "Buah"})
+SCAN_KURANG = (375, 2, "Kurang Lengkap", ITEM_SEIMBANG[::2], DETEKSI_SEIMBANG[::2], {"Karbo", "Protein"})
+
+
+class TestPenulisDatabase(unittest.TestCase):
+    def setUp(self):
+        self._folder = tempfile.TemporaryDirectory()
+        self._lama = database.DB_NAME
+        database.tutup()
+        database.DB_NAME = os.path.join(self._folder.name, "uji.db")
+
+    def tearDown(self):
+        database.tutup()
+        database.DB_NAME = self._lama
+        self._folder.cleanup()
+
+    def test_flush_menulis_tanpa_menunggu_jeda_batch(self):
+        database.simpan_scan(*SCAN)
+        database.flush()  # pemanasan: koneksi & tabel
+        mulai = time.perf_counter()
+        for _ in range(5):
+            database.simpan_scan(*SCAN)
+            database.flush()
+        self.assertLess((time.perf_counter() - mulai) / 5, database.JEDA_TULIS_MAKS)
+        self.assertEqual(len(database.ambil_riwayat_hari_ini()), 6)
+
+    def test_gagal_tulis_dilaporkan_dan_penulis_tetap_hidup(self):
+        database.init_db()
+        with mock.patch.object(database, "_tulis_batch", side_effect=RuntimeError("disk penuh")), \
+                mock.patch.object(database, "PERCOBAAN_TULIS", 1):
+            hasil = database.simpan_scan(*SCAN)
+            with self.assertRaises(database.GagalSimpan):
+                database.flush()
+        with self.assertRaises(database.GagalSimpan):
+            hasil.result(timeout=5)
+        database.flush()  # galat hanya dilaporkan sekali
+
+        database.simpan_scan(*SCAN)
+        self.assertEqual(len(database.ambil_riwayat_hari_ini()), 1)
+
+    def test_satu_scan_rusak_tidak_menggugurkan_batch(self):
+        database.init_db()
+        asli = database._tulis_batch
+
+        def tulis(conn, scans):
+            if any(row[1] < 0 for row, *_ in scans):
+                raise ValueError("kalori negatif")
+            return asli(conn, scans)
+
+        with mock.patch.object(database, "_tulis_batch", side_effect=tulis), \
+                mock.patch.object(database, "PERCOBAAN_TULIS", 1):
+            hasil = database.simpan_banyak_scan([SCAN, (-1, *SCAN[1:]), SCAN])
+            with self.assertRaises(database.GagalSimpan):
+                database.flush()
+        self.assertEqual(len(database.ambil_riwayat_hari_ini()), 2)
+        self.assertIsInstance(hasil[0].result(), int)
+        self.assertIsInstance(hasil[1].exception(), database.GagalSimpan)
+        self.assertIsInstance(hasil[2].result(), int)
+
+    def test_fungsi_baca_tidak_mengambil_galat_pemanggil_lain(self):
+        database.init_db()
+        with mock.patch.object(database, "_tulis_batch", side_effect=RuntimeError("disk penuh")), \
+                mock.patch.object(database, "PERCOBAAN_TULIS", 1):
+            hasil = database.simpan_scan(*SCAN)
+            database.ambil_riwayat_hari_ini()
+            database.ambil_waktu_tahap(7)
+            database.ambil_scan_harian()
+        self.assertIsInstance(hasil.exception(), database.GagalSimpan)
+        self.assertIsInstance(database.ambil_galat(), database.GagalSimpan)
+        self.assertIsNone(database.ambil_galat())
+
+
+    def test_rekap_diperbarui_inkremental_antar_transaksi(self):
+        database.simpan_banyak_scan([SCAN_SEIMBANG, SCAN_KURANG])
+        database.flush()
+        database.simpan_scan(*SCAN_KURANG)  # transaksi kedua: baris rekap yang sama di-UPSERT
+        database.flush()
+
+        harian = database.ambil_rekap_harian(1).iloc[0]
+        self.assertEqual(harian["Jumlah Scan"], 3)
+        self.assertEqual(harian["Rata-rata Kalori (kkal)"], (505 + 375 * 2) // 3)
+        self.assertEqual(harian["Kurang Lengkap (%)"], 66.7)
+        self.assertEqual((harian["Tanpa Sayur"], harian["Tanpa Protein"], harian["Tanpa Buah"]), (2, 0, 2))
+
+        menu = database.ambil_rekap_menu(1).set_index("Menu")
+        self.assertEqual(menu.loc["Nasi Putih", "Jumlah"], 3)
+        self.assertEqual(menu.loc["Nasi Putih", "Total Kalori (kkal)"], 3 * 175)
+        self.assertEqual(menu.loc["Pisang", "Jumlah"], 1)
+        self.assertEqual(menu.loc["Pisang", "Di Scan Kurang Lengkap (%)"], 0.0)
+        self.assertEqual(menu.loc["Ayam Goreng", "Di Scan Kurang Lengkap (%)"], 66.7)
+
+    def test_database_lama_direkap_dari_detail_menu(self):
+        # Skema lama: hanya tabel riwayat, tanpa deteksi / rekap
+        waktu = database.rentang_hari()[0]
+        conn = sqlite3.connect(database.DB_NAME)
+        conn.execute("CREATE TABLE riwayat (id INTEGER PRIMARY KEY AUTOINCREMENT, waktu TEXT, total_kalori INTEGER, "
+                     "jumlah_item INTEGER, status_gizi TEXT, detail_menu TEXT)")
+        conn.executemany("INSERT INTO riwayat (waktu, total_kalori, jumlah_item, status_gizi, detail_menu) VALUES (?, ?, ?, ?, ?)", [
+            (waktu, 505, 4, "Seimbang", "Nasi Putih, Sayur Bayam, Ayam Goreng, Pisang"),
+            (waktu, 375, 2, "Kurang Lengkap", "Nasi Putih, Ayam Goreng"),
+            (waktu, 0, 1, "Kurang Lengkap", "Menu Baru"),
+        ])
+        conn.commit()
+        conn.close()
+
+        harian = database.ambil_rekap_harian(1).iloc[0]
+        self.assertEqual(harian["Jumlah Scan"], 3)
+        self.assertEqual((harian["Tanpa Sayur"], harian["Tanpa Protein"], harian["Tanpa Buah"]), (2, 1, 2))
+
+        menu = database.ambil_rekap_menu(1).set_index("Menu")
+        self.assertEqual(menu.loc["Nasi Putih", "Jumlah"], 2)
+        self.assertEqual(menu.loc["Nasi Putih", "Total Kalori (kkal)"], 2 * 175)
+        self.assertEqual(menu.loc["Ayam Goreng", "Di Scan Kurang Lengkap (%)"], 50.0)
+        self.assertEqual(menu.loc["Menu Baru", "Total Kalori (kkal)"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
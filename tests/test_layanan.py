@@ -0,0 +1,138 @@
+"""Uji antrian & micro-batch LayananInferensi dengan model palsu (tanpa best.pt).
+
+    python -m unittest discover tests
+"""
+import threading
+import time
+import unittest
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+import numpy as np
+
+import layanan
+
+CITRA = np.zeros((48, 64, 3), dtype=np.uint8)
+
+
+class ModelPalsu:
+    """Mencatat ukuran setiap batch; bisa ditahan (gerbang) dan gagal untuk citra bertanda"""
+
+    names = {0: "nasi putih"}
+
+    def __init__(self, tahan=False):
+        self.batch = []
+        self.mulai = threading.Event()
+        self.gerbang = threading.Event()
+        if not tahan:
+            self.gerbang.set()
+
+    def prediksi(self, citra_bgr):
+        self.mulai.set()
+        self.gerbang.wait(5)
+        if any(img[0, 0, 0] == 255 for img in citra_bgr):
+            raise ValueError("citra rusak")
+        self.batch.append([img.shape for img in citra_bgr])
+        return [(np.zeros((0, 4), np.float32), np.zeros(0, np.float32), np.zeros(0, int)) for _ in citra_bgr]
+
+
+class TestLayananInferensi(unittest.TestCase):
+    def buat(self, model, **kwargs):
+        svc = layanan.LayananInferensi(model, **kwargs)
+        self.addCleanup(svc.tutup)
+        self.addCleanup(model.gerbang.set)
+        return svc
+
+    def test_permintaan_digabung_sampai_maks_batch(self):
+        model = ModelPalsu(tahan=True)
+        svc = self.buat(model, maks_batch=4, maks_tunggu=0.2)
+        pertama = svc.kirim([CITRA])
+        model.mulai.wait(5)
+        futures = [svc.kirim([CITRA]) for _ in range(6)]
+        model.gerbang.set()
+        for f in [pertama, *futures]:
+            self.assertEqual(len(f.result(5)), 1)
+        self.assertEqual([len(b) for b in model.batch], [1, 4, 2])
+
+    def test_batch_dikirim_setelah_maks_tunggu(self):
+        model = ModelPalsu()
+        svc = self.buat(model, maks_batch=8, maks_tunggu=0.1)
+        mulai = time.perf_counter()
+        a = svc.kirim([CITRA])
+        b = svc.kirim([CITRA])
+        a.result(5), b.result(5)
+        durasi = time.perf_counter() - mulai
+        self.assertGreaterEqual(durasi, 0.1)
+        self.assertLess(durasi, 1.0)
+        self.assertEqual([len(b) for b in model.batch], [2])
+
+    def test_antrian_penuh_ditolak(self):
+        model = ModelPalsu(tahan=True)
+        svc = self.buat(model, maks_batch=1, maks_antrian=2)
+        svc.kirim([CITRA])
+        model.mulai.wait(5)  # permintaan pertama sudah keluar dari antrian
+        svc.kirim([CITRA])
+        svc.kirim([CITRA])
+        with self.assertRaises(layanan.AntrianPenuh):
+            svc.kirim([CITRA])
+        self.assertEqual(svc.stats()["ditolak"], 1)
+
+    def test_citra_beda_ukuran_tidak_dicampur(self):
+        model = ModelPalsu(tahan=True)
+        svc = self.buat(model, maks_batch=8, maks_tunggu=0.2)
+        svc.kirim([CITRA])
+        model.mulai.wait(5)
+        besar = np.zeros((96, 64, 3), dtype=np.uint8)
+        futures = [svc.kirim([CITRA, besar]), svc.kirim([besar]), svc.kirim([CITRA])]
+        model.gerbang.set()
+        self.assertEqual([len(f.result(5)) for f in futures], [2, 1, 1])
+        for shapes in model.batch:
+            self.assertEqual(len(set(shapes)), 1)
+
+    def test_satu_permintaan_gagal_tidak_menggugurkan_batch(self):
+        model = ModelPalsu(tahan=True)
+        svc = self.buat(model, maks_batch=8, maks_tunggu=0.2)
+        svc.kirim([CITRA])
+        model.mulai.wait(5)
+        rusak = CITRA.copy()
+        rusak[0, 0, 0] = 255
+        baik, gagal = svc.kirim([CITRA]), svc.kirim([rusak])
+        model.gerbang.set()
+        self.assertEqual(len(baik.result(5)), 1)
+        with self.assertRaises(ValueError):
+            gagal.result(5)
+
+
+class TestServerHTTP(unittest.TestCase):
+    def setUp(self):
+        self.svc = layanan.LayananInferensi(ModelPalsu())
+        self.server = layanan.buat_server(self.svc, "127.0.0.1", 0)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.svc.tutup()
+
+    def kirim(self, data):
+        try:
+            with urlopen(Request(f"{self.url}/prediksi", data=data), timeout=5) as resp:
+                return resp.status
+        except HTTPError as e:
+            return e.code
+
+    def test_body_tidak_valid_ditolak_400(self):
+        self.assertEqual(self.kirim(b"bukan npz"), 400)
+        self.assertEqual(self.kirim(layanan._ke_npz({"citra_0": np.zeros((4, 4), np.uint8)})), 400)
+        self.assertEqual(self.kirim(layanan._ke_npz({"citra_0": np.zeros((4, 4, 3), np.float32)})), 400)
+        self.assertEqual(self.kirim(layanan._ke_npz({"citra_0": CITRA})), 200)
+
+    def test_galat_model_dibalas_500(self):
+        rusak = CITRA.copy()
+        rusak[0, 0, 0] = 255
+        self.assertEqual(self.kirim(layanan._ke_npz({"citra_0": rusak})), 500)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,33 @@
+"""Uji penulisan file metrik berkala (MBG_METRIK_FILE).
+
+    python -m unittest discover tests
+"""
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import metrik
+
+
+class TestFileMetrik(unittest.TestCase):
+    def test_tahap_tanpa_scan_tetap_tertulis_ke_file(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "mbg.prom")
+            with mock.patch.dict(os.environ, {"MBG_METRIK_FILE": path}), \
+                    mock.patch.object(metrik, "JEDA_TULIS_FILE", 0.05):
+                # Hanya tahap pdf (tanpa catat_scan): file tetap diperbarui oleh thread penulis
+                with metrik.ukur("pdf"):
+                    pass
+                batas = time.monotonic() + 2.0
+                while time.monotonic() < batas:
+                    if os.path.exists(path) and 'tahap="pdf"' in open(path).read():
+                        break
+                    time.sleep(0.02)
+                with open(path) as f:
+                    self.assertIn('mbg_tahap_detik_count{tahap="pdf"}', f.read())
+
+
+if __name__ == "__main__":
+    unittest.main()
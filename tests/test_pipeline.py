@@ -0,0 +1,122 @@
+"""Uji pipeline deteksi dengan model palsu (tanpa best.pt / ultralytics).
+
+    python -m unittest discover tests
+"""
+import io
+import os
+import tempfile
+import unittest
+
+import numpy as np
+from PIL import Image
+
+import pipeline
+
+
+class _Tensor(np.ndarray):
+    """Array dengan cpu()/numpy() seperti tensor torch di results[i].boxes"""
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.view(np.ndarray)
+
+
+class _Boxes:
+    def __init__(self, xyxy, conf, cls):
+        self.xyxy, self.conf, self.cls = xyxy.view(_Tensor), conf.view(_Tensor), cls.view(_Tensor)
+
+
+class _Hasil:
+    def __init__(self, boxes):
+        self.boxes = boxes
+
+
+class ModelKandidat:
+    """Model palsu dengan semantik predict ultralytics: ambang conf, NMS per kelas, lalu max_det"""
+
+    names = {0: "nasi putih", 1: "ayam goreng"}
+
+    def __init__(self, xyxy, confs, cls_ids):
+        self.kandidat = (xyxy.astype(np.float32), confs.astype(np.float32), cls_ids.astype(np.float32))
+
+    def predict(self, source, conf=0.25, iou=0.7, max_det=300, **kwargs):
+        xyxy, confs, cls_ids = self.kandidat
+        mask = confs > conf
+        xyxy, confs, cls_ids = xyxy[mask], confs[mask], cls_ids[mask]
+        if iou < 1.0:
+            keep = pipeline.nms_per_kelas(xyxy, confs, cls_ids.astype(int), iou)
+        else:
+            keep = np.argsort(-confs, kind="stable")
+        keep = keep[:max_det]
+        sumber = source if isinstance(source, list) else [source]
+        return [_Hasil(_Boxes(xyxy[keep], confs[keep], cls_ids[keep])) for _ in sumber]
+
+
+class TestDeteksiMentah(unittest.TestCase):
+    def test_saring_ulang_sama_dengan_predict_walau_kandidat_lebih_dari_300(self):
+        rng = np.random.default_rng(0)
+        # 400 kotak hampir kembar ber-confidence tinggi + 20 item terpisah ber-confidence rendah
+        kembar = np.array([100, 100, 300, 300], dtype=np.float32) + rng.uniform(-2, 2, size=(400, 4))
+        item = np.array([[400 + 30 * i, 50, 420 + 30 * i, 70] for i in range(20)], dtype=np.float32)
+        xyxy = np.concatenate([kembar, item])
+        confs = np.concatenate([rng.uniform(0.8, 0.99, 400), np.full(20, 0.2)])
+        cls_ids = np.concatenate([np.zeros(400), np.ones(20)])
+        model = ModelKandidat(xyxy, confs, cls_ids)
+        img = np.zeros((640, 1100, 3), dtype=np.uint8)
+
+        for conf, iou in ((0.15, 0.45), (0.1, 0.7)):
+            xyxy_s, confs_s, cls_s = pipeline.saring_deteksi(pipeline.deteksi_mentah(model, img), conf, iou, max_det=50)
+            acuan = model.predict(img, conf=conf, iou=iou, max_det=50)[0].boxes
+            xyxy_a, confs_a, cls_a = pipeline.boxes_ke_array(acuan)
+            self.assertEqual(len(confs_s), 21)
+            np.testing.assert_array_equal(xyxy_s, xyxy_a)
+            np.testing.assert_array_equal(confs_s, confs_a)
+            np.testing.assert_array_equal(cls_s, cls_a)
+
+
+def jpeg_berorientasi(rgb, orientasi=6):
+    """JPEG dengan tag EXIF Orientation (6 = perlu diputar 90 derajat saat ditampilkan)"""
+    exif = Image.Exif()
+    exif[0x0112] = orientasi
+    buf = io.BytesIO()
+    Image.fromarray(rgb).save(buf, "JPEG", quality=95, exif=exif)
+    return buf.getvalue()
+
+
+class TestMuatCitra(unittest.TestCase):
+    def test_orientasi_exif_diabaikan_seperti_jalur_pil(self):
+        rgb = np.zeros((400, 800, 3), dtype=np.uint8)
+        rgb[:, :200] = (255, 0, 0)
+        data = jpeg_berorientasi(rgb)
+        acuan = np.asarray(Image.open(io.BytesIO(data)))[..., ::-1]  # jalur lama: PIL tanpa exif_transpose
+
+        asli = pipeline.muat_citra(data, sisi_maks=None)
+        self.assertEqual(asli.shape, acuan.shape)
+        self.assertLess(np.abs(asli.astype(int) - acuan).mean(), 2)
+
+        # Dekode tereduksi mempertahankan orientasi yang sama (hanya skalanya berubah)
+        tereduksi = pipeline.muat_citra(data, sisi_maks=400)
+        self.assertEqual(tereduksi.shape, (200, 400, 3))
+        self.assertGreater(tereduksi[:, :90, 2].mean(), 200)  # kolom kiri tetap merah (kanal R pada BGR)
+
+
+class TestScanBatch(unittest.TestCase):
+    def test_file_rusak_dilewati_tanpa_menghentikan_batch(self):
+        model = ModelKandidat(np.array([[10, 10, 60, 60]]), np.array([0.9]), np.array([0]))
+        with tempfile.TemporaryDirectory() as folder:
+            paths = [os.path.join(folder, nama) for nama in ("a.jpg", "rusak.jpg", "c.jpg")]
+            for path in paths[::2]:
+                Image.fromarray(np.full((120, 160, 3), 128, dtype=np.uint8)).save(path)
+            with open(paths[1], "wb") as f:
+                f.write(b"bukan jpeg")
+
+            hasil, _, gagal = pipeline.scan_batch(paths, model, batch_size=2, workers=1, simpan=False)
+
+        self.assertEqual([r["file"] for r in hasil], paths[::2])
+        self.assertEqual([path for path, _ in gagal], [paths[1]])
+
+
+if __name__ == "__main__":
+    unittest.main()
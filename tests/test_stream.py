@@ -0,0 +1,73 @@
+"""Uji pelacakan nampan & item pada StreamScanner dengan model palsu (tanpa video / best.pt).
+
+    python -m unittest discover tests
+"""
+import unittest
+
+import numpy as np
+
+from stream import StreamScanner
+
+NAMES = {0: "nasi putih", 1: "ayam goreng", 2: "buah pisang", 3: "tray mbg"}
+FRAME = np.zeros((240, 640, 3), dtype=np.uint8)
+
+
+class ModelSkenario:
+    """Model palsu: setiap panggilan prediksi mengembalikan deteksi frame berikutnya dari skenario"""
+
+    names = NAMES
+
+    def __init__(self, skenario):
+        self._sisa = iter(skenario)
+
+    def prediksi(self, citra_bgr):
+        hasil = []
+        for _ in citra_bgr:
+            kotak = next(self._sisa, [])
+            xyxy = np.array([k[:4] for k in kotak], dtype=np.float32).reshape(-1, 4)
+            confs = np.full(len(kotak), 0.9, dtype=np.float32)
+            cls_ids = np.array([k[4] for k in kotak], dtype=int)
+            hasil.append((xyxy, confs, cls_ids))
+        return hasil
+
+
+def jalankan(skenario, max_hilang=3):
+    scanner = StreamScanner(ModelSkenario(skenario), "0", praproses=False, simpan=False, max_hilang=max_hilang)
+    for _ in skenario:
+        scanner._proses_frame(FRAME.copy())
+    return scanner
+
+
+class TestStreamScanner(unittest.TestCase):
+    def test_item_keluar_frame_sebelum_nampan_tetap_dihitung(self):
+        nampan = (0, 0, 300, 200, 3)
+        nasi = (10, 10, 80, 80, 0)
+        ayam = (120, 10, 190, 80, 1)
+        pisang = (220, 100, 280, 180, 2)
+        # Nasi & ayam keluar frame jauh sebelum nampannya; pisang bertahan sampai akhir
+        skenario = ([[nampan, nasi, ayam, pisang]] * 5 + [[nampan, pisang]] * 15) + [[]] * 6
+        scanner = jalankan(skenario)
+
+        self.assertEqual(len(scanner.hasil), 1)
+        menu = sorted(x[0] for x in scanner.hasil[0]["item_details"])
+        self.assertEqual(menu, ["Ayam Goreng", "Nasi Putih", "Pisang"])
+
+    def test_nampan_singkat_tidak_meninggalkan_item_selesai(self):
+        # Nampan hanya terlihat satu frame (< min_hits) lalu hilang bersama itemnya
+        scanner = jalankan([[(0, 0, 300, 200, 3), (10, 10, 80, 80, 0)]] + [[]] * 6)
+
+        self.assertEqual(scanner.hasil, [])
+        self.assertEqual(scanner._item_selesai, {})
+
+    def test_dua_nampan_bersebelahan_dihitung_terpisah(self):
+        kiri = [(0, 0, 300, 200, 3), (20, 20, 120, 120, 0), (150, 20, 280, 120, 1)]
+        kanan = [(310, 0, 610, 200, 3), (330, 20, 430, 120, 0), (460, 20, 590, 120, 2)]
+        scanner = jalankan([kiri + kanan] * 6 + [[]] * 5)
+
+        self.assertEqual(len(scanner.hasil), 2)
+        menu = sorted(sorted(x[0] for x in h["item_details"]) for h in scanner.hasil)
+        self.assertEqual(menu, [["Ayam Goreng", "Nasi Putih"], ["Nasi Putih", "Pisang"]])
+
+
+if __name__ == "__main__":
+    unittest.main()